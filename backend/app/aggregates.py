@@ -0,0 +1,94 @@
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from . import crud, models
+
+
+def _in_scope(column, node_id: Optional[int]):
+    # node_id=None means the whole organization
+    if node_id is None:
+        return true()
+    return column.in_(crud.subtree_node_ids(node_id))
+
+
+def subtree_summary(db: Session, node_id: Optional[int] = None) -> dict:
+    """Counts and financial loss for a subtree.
+
+    Reads the node's precomputed rollup row when there is one and otherwise
+    aggregates the base tables in a single round trip.
+    """
+    if node_id is not None:
+        rollup = db.get(models.NodeRollup, node_id)
+        if rollup is not None:
+            return {
+                "risks_count": rollup.risk_count,
+                "incidents_count": rollup.incident_count,
+                "actions_count": rollup.action_count,
+                "financial_loss": rollup.financial_loss,
+            }
+    risks_count = select(func.count(models.Risk.id)).where(
+        _in_scope(models.Risk.node_id, node_id)
+    ).scalar_subquery()
+    incidents_count = select(func.count(models.Incident.id)).where(
+        _in_scope(models.Incident.node_id, node_id)
+    ).scalar_subquery()
+    actions_count = select(func.count(models.ActionItem.id)).join(models.Risk).where(
+        _in_scope(models.Risk.node_id, node_id)
+    ).scalar_subquery()
+    financial_loss = select(func.coalesce(func.sum(models.Incident.loss_amount), 0)).where(
+        _in_scope(models.Incident.node_id, node_id),
+        models.Incident.is_financial.is_(True)
+    ).scalar_subquery()
+    row = db.execute(select(
+        risks_count.label("risks_count"),
+        incidents_count.label("incidents_count"),
+        actions_count.label("actions_count"),
+        financial_loss.label("financial_loss"),
+    )).one()
+    return dict(row._mapping)
+
+
+def risk_breakdown(db: Session, node_id: int) -> dict:
+    """``{"status": [(value, count), ...], "type": [...]}`` for a subtree, from its rollup rows."""
+    rows = (
+        db.query(models.NodeRollupBreakdown)
+        .filter(models.NodeRollupBreakdown.node_id == node_id, models.NodeRollupBreakdown.count > 0)
+        .order_by(models.NodeRollupBreakdown.dimension, models.NodeRollupBreakdown.value)
+        .all()
+    )
+    breakdown = {"status": [], "type": []}
+    for row in rows:
+        if row.value:
+            breakdown.setdefault(row.dimension, []).append((row.value, row.count))
+    return breakdown
+
+
+def recent_risks(db: Session, node_id: Optional[int] = None, limit: int = 5) -> List[models.Risk]:
+    return (
+        db.query(models.Risk)
+        .filter(_in_scope(models.Risk.node_id, node_id))
+        .order_by(models.Risk.created_at.desc(), models.Risk.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def recent_incidents(db: Session, node_id: Optional[int] = None, limit: int = 5) -> List[models.Incident]:
+    return (
+        db.query(models.Incident)
+        .filter(_in_scope(models.Incident.node_id, node_id))
+        .order_by(models.Incident.created_at.desc(), models.Incident.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def recent_actions(db: Session, node_id: Optional[int] = None, limit: int = 5) -> List[models.ActionItem]:
+    return (
+        db.query(models.ActionItem)
+        .join(models.Risk)
+        .filter(_in_scope(models.Risk.node_id, node_id))
+        .order_by(models.ActionItem.id.desc())
+        .limit(limit)
+        .all()
+    )
@@ -1,36 +1,278 @@
 import os
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 from dotenv import load_dotenv
-import pandas as pd
-import torch
+from . import metrics
+
+if TYPE_CHECKING:
+    import pandas
 
 load_dotenv()
 
 AI_PROVIDER = os.getenv("AI_PROVIDER", "openai")
 
-# Import AI SDKs as needed
-try:
-    import openai
-except ImportError:
-    openai = None
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-try:
-    import deepseek
-except ImportError:
-    deepseek = None
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering, AutoModelForSequenceClassification, AutoModelWithLMHead
-except ImportError:
-    pipeline = None
-    AutoTokenizer = None
-    AutoModelForQuestionAnswering = None
-    AutoModelForSequenceClassification = None
-    AutoModelWithLMHead = None
-
-
-def df_to_table_dict(df: pd.DataFrame) -> dict:
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+DEEPSEEK_MODEL = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+GOOGLE_MODEL = os.getenv("GOOGLE_MODEL", "gemini-1.5-pro")
+HF_QA_MODEL = "google/tapas-large-finetuned-wtq"
+HF_SUMMARIZATION_MODEL = "facebook/bart-large-cnn"
+
+# Insight cache: bounded in-memory LRU in front of an on-disk SQLite store
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", ".ai_cache.sqlite3")
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1024"))
+
+logger = logging.getLogger(__name__)
+
+# AI SDKs are imported on first use so a worker only pays for the provider it
+# actually talks to (transformers pulls in torch, which costs seconds and
+# hundreds of MB at import).
+_sdk_modules = {}
+
+
+def _import_sdk(name: str):
+    """Import and memoize an optional SDK module, returning None if it is missing."""
+    if name not in _sdk_modules:
+        try:
+            if name == "openai":
+                import openai as module
+            elif name == "genai":
+                import google.generativeai as module
+            elif name == "transformers":
+                import transformers as module
+            else:
+                raise ValueError(f"Unknown SDK {name}")
+        except ImportError:
+            module = None
+        _sdk_modules[name] = module
+    return _sdk_modules[name]
+
+
+def _is_dataframe(value) -> bool:
+    # Without pandas loaded nothing can be a DataFrame, so don't import it here
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(value, pandas.DataFrame)
+
+
+class _Unavailable(str):
+    """A placeholder answer (provider not configured); never cached."""
+
+
+def is_unavailable(text) -> bool:
+    """True for placeholder answers, which callers should not cache either."""
+    return isinstance(text, _Unavailable)
+
+
+class InsightCache:
+    """LRU of insight texts with a TTL, optionally persisted to SQLite.
+
+    The memory tier holds at most ``max_entries`` items; the disk tier (if
+    ``path`` is set) survives restarts and is shared by workers on one host.
+    The file runs in WAL mode with a short busy timeout; when it is locked
+    or failing, reads and writes fall back to the memory tier instead of
+    failing the request. Expired rows are pruned every ``PRUNE_INTERVAL_SECONDS``.
+    """
+
+    PRUNE_INTERVAL_SECONDS = 600
+
+    def __init__(self, path: Optional[str], ttl_seconds: int, max_entries: int, busy_timeout: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes the shared SQLite connection; never held with _lock, so
+        # memory hits do not wait on disk IO
+        self._disk_lock = threading.Lock()
+        self._conn = None
+        self._next_prune = 0.0
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_errors = 0
+        if path:
+            try:
+                self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS insights "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS insights_created_at ON insights (created_at)")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("AI insight cache falling back to memory only: %s", e)
+                self._conn = None
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        return value if value is not None else self._get_disk(key, now)
+
+    def set(self, key: str, value: str):
+        self._set_disk(*self._set_memory(key, value))
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """``get`` for the event loop: memory hits inline, the SQLite read on a worker thread."""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            return value
+        if self._conn is None:
+            return self._get_disk(key, now)  # only counts the miss
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    async def set_async(self, key: str, value: str):
+        """``set`` for the event loop: the memory tier inline, the SQLite write on a worker thread."""
+        pending = self._set_memory(key, value)
+        if self._conn is not None:
+            await asyncio.to_thread(self._set_disk, *pending)
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+        return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[str]:
+        row = self._disk(
+            lambda conn: conn.execute("SELECT value, created_at FROM insights WHERE key = ?", (key,)).fetchone()
+        )
+        with self._lock:
+            if row and now - row[1] < self.ttl_seconds:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def _set_memory(self, key: str, value: str) -> tuple:
+        """Store in memory; returns the arguments for ``_set_disk``."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            prune = now >= self._next_prune
+            if prune:
+                self._next_prune = now + self.PRUNE_INTERVAL_SECONDS
+        return key, value, now, prune
+
+    def _set_disk(self, key: str, value: str, now: float, prune: bool):
+        def write(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO insights (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, now)
+            )
+            if prune:
+                conn.execute("DELETE FROM insights WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.commit()
+
+        self._disk(write)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+        def delete_all(conn):
+            conn.execute("DELETE FROM insights")
+            conn.commit()
+
+        self._disk(delete_all)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_errors": self.disk_errors,
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def _disk(self, fn):
+        """Run ``fn(conn)`` on the SQLite tier; None when there is none or it fails."""
+        if self._conn is None:
+            return None
+        with self._disk_lock:
+            try:
+                return fn(self._conn)
+            except sqlite3.Error as e:
+                try:
+                    self._conn.rollback()
+                except sqlite3.Error:
+                    pass
+                with self._lock:
+                    self.disk_errors += 1
+                    first = self.disk_errors == 1
+                # A locked or full disk fails every call; log it once, stats() keeps the count
+                if first:
+                    logger.warning("AI insight cache disk tier unavailable, using memory only: %s", e)
+                else:
+                    logger.debug("AI insight cache disk error: %s", e)
+                return None
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+insight_cache = InsightCache(AI_CACHE_PATH, AI_CACHE_TTL_SECONDS, AI_CACHE_MAX_ENTRIES) if AI_CACHE_ENABLED else None
+
+
+def cache_stats() -> dict:
+    if insight_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **insight_cache.stats()}
+
+
+def _model_name(task: str) -> str:
+    if AI_PROVIDER == "hf_transformers":
+        return HF_SUMMARIZATION_MODEL if task == "summarization" else HF_QA_MODEL
+    if AI_PROVIDER == "google":
+        return GOOGLE_MODEL
+    if AI_PROVIDER == "deepseek":
+        return DEEPSEEK_MODEL
+    if AI_PROVIDER == "azure":
+        return os.getenv("AZURE_OPENAI_DEPLOYMENT", "")
+    return OPENAI_MODEL
+
+
+def insight_cache_key(text: str, table=None, task: str = "qa") -> str:
+    """Hash of provider, model and the whitespace-normalized prompt (plus table, if any)."""
+    if _is_dataframe(table):
+        table = df_to_table_dict(table)
+    normalized = re.sub(r"\s+", " ", text).strip()
+    payload = json.dumps(
+        [AI_PROVIDER, _model_name(task), task, normalized, table],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def df_to_table_dict(df: "pandas.DataFrame") -> dict:
     """
     Convert a pandas DataFrame to the dictionary format required by Hugging Face table QA/summarization models.
     Example output: {"column1": [..], "column2": [..], ...}
@@ -38,82 +280,381 @@ def df_to_table_dict(df: pd.DataFrame) -> dict:
     return df.to_dict(orient="list")
 
 
-def get_insight(text: str, table=None, task: str = "qa") -> str:
+def get_insight(text: str, table=None, task: str = "qa", use_cache: bool = True) -> str:
     """
     Generate an insight using the configured AI provider.
     If using Hugging Face transformers and table is a DataFrame, it will be converted automatically.
+    Answers are served from the insight cache when the same prompt was seen within the TTL.
     """
+    if not use_cache or insight_cache is None:
+        with metrics.ai_call(AI_PROVIDER, "generate"):
+            return _generate_insight(text, table, task)
+    key = insight_cache_key(text, table, task)
+    cached = insight_cache.get(key)
+    if cached is not None:
+        return cached
+    with metrics.ai_call(AI_PROVIDER, "generate"):
+        result = _generate_insight(text, table, task)
+    if isinstance(result, str) and not isinstance(result, _Unavailable):
+        insight_cache.set(key, result)
+    return result
+
+
+# --- Model / client registry ---
+# Every provider client and transformers pipeline is built once per process
+# and shared by all requests. Pipelines are guarded by their own lock since
+# torch modules are not safe to call from several threads at once.
+
+AI_PRELOAD = os.getenv("AI_PRELOAD", "false").lower() in ("1", "true", "yes")
+AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2023-05-15")
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _RegistryEntry:
+    def __init__(self, value, load_seconds: float, rss_delta_bytes: int, parameter_bytes: int):
+        self.value = value
+        self.lock = threading.Lock()
+        self.load_seconds = load_seconds
+        self.rss_delta_bytes = rss_delta_bytes
+        self.parameter_bytes = parameter_bytes
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _parameter_bytes(value) -> int:
+    model = getattr(value, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+def _registered(name: str, factory) -> Optional[_RegistryEntry]:
+    """Return the entry for ``name``, building it with ``factory`` on first use."""
+    entry = _registry.get(name)
+    if entry is not None:
+        return entry
+    with _registry_lock:
+        entry = _registry.get(name)
+        if entry is not None:
+            return entry
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        value = factory()
+        if value is None:
+            return None
+        entry = _RegistryEntry(
+            value,
+            load_seconds=time.perf_counter() - started,
+            rss_delta_bytes=max(_rss_bytes() - rss_before, 0),
+            parameter_bytes=_parameter_bytes(value),
+        )
+        _registry[name] = entry
+        return entry
+
+
+def get_pipeline(task: str) -> Optional[_RegistryEntry]:
+    """The shared transformers pipeline for ``task`` ("qa" or "summarization")."""
+    transformers = _import_sdk("transformers")
+    if not transformers:
+        return None
+    if task == "summarization":
+        return _registered(
+            f"hf:{HF_SUMMARIZATION_MODEL}",
+            lambda: transformers.pipeline("summarization", model=HF_SUMMARIZATION_MODEL)
+        )
+    return _registered(
+        f"hf:{HF_QA_MODEL}",
+        lambda: transformers.pipeline("table-question-answering", model=HF_QA_MODEL)
+    )
+
+
+def _build_client(provider: str):
+    if provider == "google":
+        api_key = os.getenv("GOOGLE_API_KEY")
+        genai = _import_sdk("genai") if api_key else None
+        if not genai:
+            return None
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(GOOGLE_MODEL)
+    openai = _import_sdk("openai")
+    if not openai:
+        return None
+    if provider == "deepseek":
+        api_key = os.getenv("DEEPSEEK_API_KEY")
+        if not api_key:
+            return None
+        # Use OpenAI-compatible client for DeepSeek
+        return openai.OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+    if provider == "azure":
+        api_key = os.getenv("AZURE_OPENAI_KEY")
+        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        if not api_key or not endpoint or not os.getenv("AZURE_OPENAI_DEPLOYMENT"):
+            return None
+        return openai.AzureOpenAI(api_key=api_key, azure_endpoint=endpoint, api_version=AZURE_OPENAI_API_VERSION)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    return openai.OpenAI(api_key=api_key)
+
+
+def get_client(provider: str = None):
+    """The shared API client for ``provider`` (defaults to AI_PROVIDER), or None if not configured."""
+    provider = provider or AI_PROVIDER
+    entry = _registered(f"client:{provider}", lambda: _build_client(provider))
+    return entry.value if entry else None
+
+
+def _build_async_client(provider: str):
+    if provider == "google":
+        return None
+    openai = _import_sdk("openai")
+    if not openai:
+        return None
+    if provider == "deepseek":
+        api_key = os.getenv("DEEPSEEK_API_KEY")
+        if not api_key:
+            return None
+        return openai.AsyncOpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+    if provider == "azure":
+        api_key = os.getenv("AZURE_OPENAI_KEY")
+        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        if not api_key or not endpoint or not os.getenv("AZURE_OPENAI_DEPLOYMENT"):
+            return None
+        return openai.AsyncAzureOpenAI(api_key=api_key, azure_endpoint=endpoint, api_version=AZURE_OPENAI_API_VERSION)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    return openai.AsyncOpenAI(api_key=api_key)
+
+
+def get_async_client(provider: str = None):
+    """The shared asyncio client for an OpenAI-compatible provider, or None."""
+    provider = provider or AI_PROVIDER
+    entry = _registered(f"async_client:{provider}", lambda: _build_async_client(provider))
+    return entry.value if entry else None
+
+
+def warm_up():
+    """Build the clients/pipelines for the configured provider ahead of the first request."""
+    if AI_PROVIDER == "hf_transformers":
+        get_pipeline("summarization")
+        get_pipeline("qa")
+    else:
+        get_client(AI_PROVIDER)
+        get_async_client(AI_PROVIDER)
+
+
+def registry_stats() -> dict:
+    """Load time and memory per registered model or client."""
+    return {
+        name: {
+            "load_seconds": round(entry.load_seconds, 3),
+            "rss_delta_mb": round(entry.rss_delta_bytes / 2**20, 1),
+            "parameter_mb": round(entry.parameter_bytes / 2**20, 1),
+        }
+        for name, entry in list(_registry.items())
+    }
+
+
+def _generate_insight(text: str, table=None, task: str = "qa") -> str:
     if AI_PROVIDER == "hf_transformers":
-        if not pipeline:
-            return "Transformers not installed."
+        if not _import_sdk("transformers"):
+            return _Unavailable("Transformers not installed.")
         # If table is a DataFrame, convert it
-        if isinstance(table, pd.DataFrame):
+        if _is_dataframe(table):
             table = df_to_table_dict(table)
         # Table QA (Tapas, TAPEX)
         if task == "qa" and table is not None:
-            qa_pipe = pipeline(
-                "table-question-answering",
-                model="google/tapas-large-finetuned-wtq"
-            )
-            result = qa_pipe(table=table, query=text)
+            qa_pipe = get_pipeline("qa")
+            with qa_pipe.lock:
+                result = qa_pipe.value(table=table, query=text)
             return result["answer"]
         # Table summarization (BART-large-CNN)
         elif task == "summarization" and table is not None:
-            # Use facebook/bart-large-cnn for table-to-text summarization
-            summarizer = pipeline(
-                "summarization",
-                model="facebook/bart-large-cnn"
-            )
-            table_str = str(table)
-            result = summarizer(table_str)
-            return result[0]["summary_text"]
+            # Chunked map-reduce so large tables are not silently truncated
+            from .summarization import summarize_tables
+            return summarize_tables({"table": table})["table"]
         else:
-            return "Task or table not supported for Hugging Face transformers."
+            return _Unavailable("Task or table not supported for Hugging Face transformers.")
     elif AI_PROVIDER == "google":
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not genai or not api_key:
-            return "Google AI Studio not configured."
-        genai.configure(api_key=api_key)
-        # Example for Gemini 1.5 Pro
-        model = genai.GenerativeModel("gemini-1.5-pro")
+        model = get_client("google")
+        if model is None:
+            return _Unavailable("Google AI Studio not configured.")
         response = model.generate_content(text)
         return response.text
     elif AI_PROVIDER == "deepseek":
-        api_key = os.getenv("DEEPSEEK_API_KEY")
-        if not api_key:
-            return "DeepSeek not configured."
-        # Use OpenAI-compatible client for DeepSeek
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+        client = get_client("deepseek")
+        if client is None:
+            return _Unavailable("DeepSeek not configured.")
         response = client.chat.completions.create(
-            model="deepseek-chat",
+            model=DEEPSEEK_MODEL,
             messages=[{"role": "user", "content": text}]
         )
         return response.choices[0].message.content
     elif AI_PROVIDER == "azure":
-        api_key = os.getenv("AZURE_OPENAI_KEY")
-        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-        if not openai or not api_key or not endpoint or not deployment:
-            return "Azure OpenAI not configured."
-        openai.api_type = "azure"
-        openai.api_key = api_key
-        openai.api_base = endpoint
-        openai.api_version = "2023-05-15"
-        response = openai.ChatCompletion.create(
-            engine=deployment,
+        client = get_client("azure")
+        if client is None:
+            return _Unavailable("Azure OpenAI not configured.")
+        response = client.chat.completions.create(
+            model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
             messages=[{"role": "user", "content": text}]
         )
-        return response.choices[0].message["content"]
+        return response.choices[0].message.content
     else:
         # Default to OpenAI
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not openai or not api_key:
-            return "OpenAI not configured."
-        openai.api_key = api_key
-        openai.api_type = "openai"
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        client = get_client("openai")
+        if client is None:
+            return _Unavailable("OpenAI not configured.")
+        response = client.chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[{"role": "user", "content": text}]
         )
         return response.choices[0].message.content
+
+
+# --- Async API ---
+# Used by the async routes so a slow completion never blocks the event loop.
+# OpenAI-compatible providers and Gemini use their native async calls; the
+# transformers path runs on a small bounded thread pool.
+
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "30"))
+AI_MAX_WORKERS = int(os.getenv("AI_MAX_WORKERS", "2"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="ai")
+    return _executor
+
+
+async def get_insight_async(text: str, table=None, task: str = "qa", use_cache: bool = True,
+                            timeout: Optional[float] = None) -> str:
+    """
+    Async counterpart of ``get_insight``.
+    Raises ``asyncio.TimeoutError`` after ``timeout`` seconds (default AI_TIMEOUT_SECONDS);
+    cancelling the awaiting task cancels the provider request.
+    """
+    key = None
+    if use_cache and insight_cache is not None:
+        key = insight_cache_key(text, table, task)
+        cached = await insight_cache.get_async(key)
+        if cached is not None:
+            return cached
+    with metrics.ai_call(AI_PROVIDER, "generate_async"):
+        result = await asyncio.wait_for(
+            _generate_insight_async(text, table, task),
+            timeout=timeout if timeout is not None else AI_TIMEOUT_SECONDS
+        )
+    if key is not None and isinstance(result, str) and not isinstance(result, _Unavailable):
+        await insight_cache.set_async(key, result)
+    return result
+
+
+async def _generate_insight_async(text: str, table=None, task: str = "qa") -> str:
+    if AI_PROVIDER == "hf_transformers":
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), _generate_insight, text, table, task)
+    elif AI_PROVIDER == "google":
+        model = get_client("google")
+        if model is None:
+            return _Unavailable("Google AI Studio not configured.")
+        response = await model.generate_content_async(text)
+        return response.text
+    client = get_async_client(AI_PROVIDER)
+    if client is None:
+        if AI_PROVIDER == "deepseek":
+            return _Unavailable("DeepSeek not configured.")
+        if AI_PROVIDER == "azure":
+            return _Unavailable("Azure OpenAI not configured.")
+        return _Unavailable("OpenAI not configured.")
+    response = await client.chat.completions.create(
+        model=_model_name(task),
+        messages=[{"role": "user", "content": text}]
+    )
+    return response.choices[0].message.content
+
+
+async def _within(stream, timeout: float) -> AsyncIterator:
+    """Iterate ``stream``, raising ``asyncio.TimeoutError`` if any chunk takes longer than ``timeout``."""
+    iterator = stream.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        # Release the provider connection when the consumer stops or times out
+        close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+async def stream_insight(text: str, use_cache: bool = True, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Yield the insight for ``text`` piece by piece as the provider produces it.
+    Cached answers are yielded in one piece; the completed text is cached.
+    Providers without a streaming mode (transformers) yield a single piece.
+    Raises ``asyncio.TimeoutError`` when the provider is silent for ``timeout``
+    seconds (default AI_TIMEOUT_SECONDS) before the first piece or between pieces.
+    """
+    timeout = timeout if timeout is not None else AI_TIMEOUT_SECONDS
+    key = None
+    if use_cache and insight_cache is not None:
+        key = insight_cache_key(text)
+        cached = await insight_cache.get_async(key)
+        if cached is not None:
+            yield cached
+            return
+    parts = []
+    if AI_PROVIDER == "hf_transformers":
+        result = await get_insight_async(text, use_cache=False, timeout=timeout)
+        yield result
+        return
+    elif AI_PROVIDER == "google":
+        model = get_client("google")
+        if model is None:
+            yield _Unavailable("Google AI Studio not configured.")
+            return
+        with metrics.ai_call(AI_PROVIDER, "stream"):
+            response = await asyncio.wait_for(model.generate_content_async(text, stream=True), timeout)
+            async for chunk in _within(response, timeout):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+    else:
+        client = get_async_client(AI_PROVIDER)
+        if client is None:
+            yield await _generate_insight_async(text)
+            return
+        with metrics.ai_call(AI_PROVIDER, "stream"):
+            stream = await asyncio.wait_for(client.chat.completions.create(
+                model=_model_name("qa"),
+                messages=[{"role": "user", "content": text}],
+                stream=True
+            ), timeout)
+            async for chunk in _within(stream, timeout):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+    if key is not None and parts:
+        await insight_cache.set_async(key, "".join(parts))
@@ -0,0 +1,84 @@
+"""
+Fingerprinted, precompressed static assets.
+
+``StaticAssets`` is a drop-in ``StaticFiles`` mount. At startup it hashes
+every file in the directory and serves it under a content-addressed name
+(``css/style.3f2a9c1b7e40.css``) with far-future ``immutable`` caching,
+from memory, using gzip/brotli variants compressed once at the best level.
+Templates build those URLs with ``static_url("css/style.css")``, so a
+changed file gets a new URL and repeat page loads fetch no asset bytes.
+
+Plain (unhashed) paths still work and are served from disk with
+``no-cache``.
+"""
+import hashlib
+import mimetypes
+import os
+from typing import Dict, NamedTuple
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from . import compression
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+PRECOMPRESS_MIN_SIZE = 256
+
+
+class _Asset(NamedTuple):
+    body: bytes
+    media_type: str
+    digest: str
+    encoded: Dict[str, bytes]
+
+
+class StaticAssets(StaticFiles):
+    def __init__(self, *, directory: str, url_prefix: str = "/static", **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.manifest: Dict[str, str] = {}  # logical path -> fingerprinted path
+        self._assets: Dict[str, _Asset] = {}
+        self._build(directory)
+
+    def _build(self, directory: str):
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                full_path = os.path.join(root, filename)
+                logical = os.path.relpath(full_path, directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    body = f.read()
+                digest = hashlib.sha256(body).hexdigest()[:12]
+                stem, ext = os.path.splitext(logical)
+                media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                encoded = {}
+                if len(body) >= PRECOMPRESS_MIN_SIZE and media_type.startswith(compression.COMPRESSIBLE_TYPES):
+                    encoded["gzip"] = compression.compress(body, "gzip", best=True)
+                    if compression.brotli is not None:
+                        encoded["br"] = compression.compress(body, "br", best=True)
+                fingerprinted = f"{stem}.{digest}{ext}"
+                self._assets[fingerprinted] = _Asset(body, media_type, digest, encoded)
+                self.manifest[logical] = fingerprinted
+
+    def url(self, path: str) -> str:
+        """The fingerprinted URL for ``path`` (relative to the directory); unknown paths map to themselves."""
+        path = path.lstrip("/")
+        return f"{self.url_prefix}/{self.manifest.get(path, path)}"
+
+    async def get_response(self, path: str, scope) -> Response:
+        asset = self._assets.get(path.replace(os.sep, "/"))
+        if asset is None:
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("Cache-Control", "no-cache")
+            return response
+        request_headers = Headers(scope=scope)
+        encoding = compression.accepted_encoding(request_headers.get("accept-encoding", ""))
+        body = asset.encoded.get(encoding)
+        etag = f'"{asset.digest}-{encoding}"' if body is not None else f'"{asset.digest}"'
+        headers = {"Cache-Control": IMMUTABLE, "ETag": etag, "Vary": "Accept-Encoding"}
+        if_none_match = request_headers.get("if-none-match", "")
+        if f'"{asset.digest}"' in compression.strip_etag_suffix(if_none_match):
+            return Response(status_code=304, headers=headers)
+        if body is None:
+            body = asset.body
+        else:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type=asset.media_type, headers=headers)
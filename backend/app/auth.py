@@ -0,0 +1,224 @@
+"""
+Password hashing and authenticated principals.
+
+Passwords are hashed and verified with bcrypt on a small dedicated thread
+pool, so a burst of logins cannot stall the event loop or starve the
+default threadpool. ``BCRYPT_ROUNDS`` sets the cost; hashes made with a
+different cost are transparently rehashed on the next successful login.
+
+Resolving a token used to cost a ``users`` SELECT on every request. A
+``Principal`` is an immutable snapshot of the user, cached per token
+subject for ``PRINCIPAL_CACHE_TTL_SECONDS``. It holds the user's
+``node_id`` only, not their subtree (a Root user's subtree can be 100k+
+ids): pages scope through closure-table subqueries and ``can_access`` is
+a primary-key lookup on ``node_closure``.
+
+The crud writers invalidate entries explicitly (a user's own entry when the
+user changes, every entry when the hierarchy changes). Other worker
+processes only see those changes once their entries expire, so keep the TTL
+short.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from . import models
+from .database import DBRunner, get_db
+
+SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
+ALGORITHM = "HS256"
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
+# min == max == default: any hash with another cost "needs update"
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """``(valid, new_hash)``; ``new_hash`` is set when the stored hash should be replaced.
+
+    A missing hash still costs one bcrypt round so unknown usernames take as
+    long as wrong passwords.
+    """
+    if not hashed_password:
+        pwd_context.dummy_verify()
+        return False, None
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+async def verify_password_async(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    return await asyncio.get_running_loop().run_in_executor(
+        _hash_executor, verify_password, password, hashed_password
+    )
+
+
+def _login_row(db: Session, username: str):
+    return db.execute(
+        select(models.User.id, models.User.username, models.User.hashed_password)
+        .where(models.User.username == username)
+    ).first()
+
+
+def _store_hash(db: Session, user_id: int, hashed_password: str):
+    db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password))
+    db.commit()
+
+
+async def authenticate_user(db: DBRunner, username: str, password: str) -> Optional[str]:
+    """The username if ``password`` is right, else None. Rehashes outdated hashes."""
+    row = await db.run(_login_row, username)
+    valid, new_hash = await verify_password_async(password, row.hashed_password if row else None)
+    if not valid:
+        return None
+    if new_hash:
+        await db.run(_store_hash, row.id, new_hash)
+    return row.username
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, with the same attributes as ``models.User``."""
+    id: int
+    username: str
+    email: str
+    node_id: Optional[int]
+    level: int
+    is_active: bool
+
+    def can_access(self, db: Session, node_id: int) -> bool:
+        """Whether ``node_id`` is in the user's subtree (one indexed ``node_closure`` lookup)."""
+        if self.node_id is None:
+            return False
+        return db.execute(
+            select(models.NodeClosure.depth)
+            .where(models.NodeClosure.ancestor_id == self.node_id, models.NodeClosure.descendant_id == node_id)
+        ).first() is not None
+
+
+class PrincipalCache:
+    """LRU of ``username -> (expires_at, Principal)``; the lock never spans DB IO."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, principal: Principal):
+        with self._lock:
+            self._entries[principal.username] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None):
+        """Drop ``username``'s entry, or every entry when no username is given."""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+def invalidate_principals(username: Optional[str] = None):
+    principal_cache.invalidate(username)
+
+
+def _read_principal(db: Session, username: str) -> Optional[Principal]:
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if user is None:
+        return None
+    return Principal(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        node_id=user.node_id,
+        level=user.level,
+        is_active=bool(user.is_active),
+    )
+
+
+def load_principal(db: Session, username: str) -> Optional[Principal]:
+    """The cached principal for ``username``, loading it (one query) on a miss."""
+    principal = principal_cache.get(username)
+    if principal is None:
+        principal = _read_principal(db, username)
+        if principal is not None:
+            principal_cache.set(principal)
+    return principal
+
+
+async def load_principal_async(db: DBRunner, username: str) -> Optional[Principal]:
+    """``load_principal`` for async routes: cache hits stay on the loop, misses go through ``db``."""
+    principal = principal_cache.get(username)
+    if principal is None:
+        principal = await db.run(_read_principal, username)
+        if principal is not None:
+            principal_cache.set(principal)
+    return principal
+
+
+def token_subject(token: str) -> Optional[str]:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    username = token_subject(token)
+    if username is None:
+        raise credentials_exception
+    principal = load_principal(db, username)
+    if principal is None:
+        raise credentials_exception
+    return principal
@@ -0,0 +1,144 @@
+"""
+Response compression for dynamic responses.
+
+``CompressionMiddleware`` compresses complete (single-chunk) responses of
+at least ``COMPRESSION_MIN_SIZE`` bytes with brotli when the client accepts
+it and the ``brotli`` package is installed, otherwise with gzip. Streaming
+responses (exports, Server-Sent Events) and bodies that already carry a
+``Content-Encoding`` pass through untouched.
+
+Strong ETags must differ per encoding, so compressed responses get an
+encoding suffix on their ETag (``"abc-gzip"``) and the suffix is stripped
+from incoming ``If-None-Match`` headers before the app compares them. A
+``304`` answering such a header carries the suffixed ETag back.
+"""
+import gzip
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+_ETAG_SUFFIX = re.compile(r'-(?:gzip|br)"')
+
+
+def accepted_encoding(accept_encoding: str) -> str:
+    """``"br"``, ``"gzip"`` or ``""`` for an ``Accept-Encoding`` header value."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return ""
+
+
+def strip_etag_suffix(value: str) -> str:
+    """Map ``"abc-gzip"`` (as sent for a compressed body) back to ``"abc"``."""
+    return _ETAG_SUFFIX.sub('"', value)
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compress ``body``; ``best`` trades CPU for size (for assets compressed once)."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if best else GZIP_LEVEL)
+
+
+def _encoded_headers(headers, encoding: str) -> list:
+    """``headers`` with the strong ETag suffixed for ``encoding`` and ``Accept-Encoding`` in ``Vary``."""
+    new_headers, vary = [], None
+    for key, value in headers:
+        lower = key.lower()
+        if lower == b"etag" and value.endswith(b'"') and not value.startswith(b"W/"):
+            value = value[:-1] + f"-{encoding}\"".encode()
+        if lower == b"vary":
+            vary = value
+            continue
+        new_headers.append((key, value))
+    if not vary:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower():
+        vary += b", Accept-Encoding"
+    new_headers.append((b"vary", vary))
+    return new_headers
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {}
+        for key, value in scope["headers"]:
+            headers.setdefault(key, value)
+        encoding = accepted_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if not encoding or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        rewritten = False
+        if b"if-none-match" in headers:
+            # The app only knows the identity ETag (scope is updated in place so
+            # outer middleware still sees what the router adds to it)
+            stripped = strip_etag_suffix(headers[b"if-none-match"].decode("latin-1")).encode("latin-1")
+            rewritten = stripped != headers[b"if-none-match"]
+            scope["headers"] = [
+                (key, strip_etag_suffix(value.decode("latin-1")).encode("latin-1") if key == b"if-none-match" else value)
+                for key, value in scope["headers"]
+            ]
+
+        start = None
+        streaming = False
+
+        async def send_compressed(message):
+            nonlocal start, streaming
+            if message["type"] == "http.response.start":
+                start = message  # held until we know whether the body is complete
+                return
+            if message["type"] != "http.response.body" or streaming or start is None:
+                return await send(message)
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming response: pass through as is
+                streaming = True
+                await send(start)
+                return await send(message)
+            response_headers = start["headers"]
+            names = {key.lower(): value for key, value in response_headers}
+            content_type = names.get(b"content-type", b"").decode("latin-1")
+            if start["status"] == 304 and rewritten:
+                # The client validated a compressed copy; answer with the ETag it holds
+                await send({**start, "headers": _encoded_headers(response_headers, encoding)})
+                return await send(message)
+            if (
+                len(body) < self.minimum_size
+                or b"content-encoding" in names
+                or start["status"] < 200 or start["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                return await send(message)
+            body = compress(body, encoding)
+            new_headers = [(key, value) for key, value in _encoded_headers(response_headers, encoding)
+                           if key.lower() != b"content-length"]
+            new_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({**start, "headers": new_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,82 @@
+"""
+Conditional GET support driven by the data version counters.
+
+A response's validators are derived from the versions of the tables it
+reads plus a scope string (route, query string, user), so checking them
+costs one small query on ``data_versions``. When the client's
+``If-None-Match`` (or ``If-Modified-Since``) still matches, the route
+answers ``304`` before loading any rows or rendering any template.
+
+Versions are read before the data, so a write racing the request can only
+make the ETag older than the body, which costs the client one extra full
+response, never a stale one.
+"""
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, NamedTuple, Optional
+import datetime
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from . import versions
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime.datetime]
+
+
+def compute_validators(db: Session, tables: Iterable[str], scope: str = "") -> Validators:
+    tables = sorted(tables)
+    current = versions.get_versions(db, tables)
+    key = scope + "|" + ",".join(f"{name}:{current.get(name, (0, None))[0]}" for name in tables)
+    etag = '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+    stamps = [updated_at for _, updated_at in current.values() if updated_at is not None]
+    return Validators(etag, max(stamps) if stamps else None)
+
+
+def request_scope(request: Request, *extra) -> str:
+    """Path, query string and any extra values (e.g. the user) that change the body."""
+    return "|".join([request.url.path, request.url.query, *map(str, extra)])
+
+
+def _whole_second(value: datetime.datetime) -> datetime.datetime:
+    # HTTP dates have no fraction, so round up: truncating would let a write
+    # later in the same second still compare as not modified
+    value = value.replace(tzinfo=datetime.timezone.utc)
+    if value.microsecond:
+        value = value.replace(microsecond=0) + datetime.timedelta(seconds=1)
+    return value
+
+
+def _http_date(value: datetime.datetime) -> str:
+    return format_datetime(_whole_second(value), usegmt=True)
+
+
+def is_fresh(request: Request, validators: Validators) -> bool:
+    """True when the client's cached copy still matches ``validators``."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or validators.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        modified = _whole_second(validators.last_modified)
+        return since is not None and since.tzinfo is not None and modified <= since
+    return False
+
+
+def apply(response: Response, validators: Validators, private: bool = True) -> Response:
+    """Set ``ETag``/``Last-Modified`` and require revalidation on every use."""
+    response.headers["ETag"] = validators.etag
+    if validators.last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(validators.last_modified)
+    response.headers["Cache-Control"] = ("private, " if private else "") + "no-cache"
+    return response
+
+
+def not_modified(validators: Validators, private: bool = True) -> Response:
+    return apply(Response(status_code=304), validators, private)
@@ -1,27 +1,200 @@
-from sqlalchemy.orm import Session
-from . import models, schemas
-from typing import List, Optional
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from sqlalchemy import Integer, delete, insert, literal, select, text, tuple_, update
+from sqlalchemy.orm import Query, Session, aliased
+from . import auth, models, schemas, rollups, versions
+from typing import Dict, List, Optional, Tuple
+import base64
+import datetime
+import json
+import time
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    # Uses the configured BCRYPT_ROUNDS
+    return auth.hash_password(password)
+
+# Keyset pagination
+#
+# List queries are ordered by ``id`` or ``(created_at, id)`` (``-created_at``
+# for newest first) and resume after the last key of the previous page, so
+# every page costs one index range scan no matter how deep it is. Cursors are
+# opaque to clients.
+
+def _order_columns(model, order_by: str) -> list:
+    return [model.created_at, model.id] if order_by.lstrip("-") == "created_at" else [model.id]
+
+def encode_cursor(order_by: str, keys: list) -> str:
+    payload = json.dumps({"o": order_by, "k": [k.isoformat() if isinstance(k, datetime.datetime) else k for k in keys]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order_by: str) -> list:
+    """Raises ValueError for malformed cursors or ones issued for another ordering."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        keys = payload["k"]
+        order = payload.get("o")
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(keys, list):
+        raise ValueError("Invalid cursor")
+    by_date = order_by.lstrip("-") == "created_at"
+    if order != order_by or len(keys) != (2 if by_date else 1):
+        raise ValueError("Cursor does not match the requested ordering")
+    # bool is an int subclass, but never a valid id
+    if not isinstance(keys[-1], int) or isinstance(keys[-1], bool):
+        raise ValueError("Invalid cursor")
+    if by_date:
+        try:
+            keys[0] = datetime.datetime.fromisoformat(keys[0])
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+    return keys
+
+def paginate(query: Query, model, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id") -> Tuple[list, Optional[str]]:
+    """One page of ``query`` and the cursor for the next page (None on the last page)."""
+    columns = _order_columns(model, order_by)
+    descending = order_by.startswith("-")
+    if cursor:
+        keys = decode_cursor(cursor, order_by)
+        key, after = (tuple_(*columns), tuple_(*keys)) if len(columns) > 1 else (columns[0], keys[0])
+        query = query.filter(key < after if descending else key > after)
+    items = query.order_by(*[c.desc() if descending else c for c in columns]).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(order_by, [getattr(last, c.key) for c in columns])
 
 # Node CRUD
 
 def create_node(db: Session, node: schemas.NodeCreate) -> models.Node:
     db_node = models.Node(**node.dict())
     db.add(db_node)
+    db.flush()
+    _insert_node_closure(db, db_node.id, db_node.parent_id)
+    db.add(models.NodeRollup(node_id=db_node.id))
+    versions.bump_version(db, versions.HIERARCHY)
     db.commit()
+    auth.invalidate_principals()
     db.refresh(db_node)
     return db_node
 
+def _insert_node_closure(db: Session, node_id: int, parent_id: Optional[int]):
+    # Self row, then one row per ancestor of the parent (one level deeper)
+    db.execute(insert(models.NodeClosure).values(ancestor_id=node_id, descendant_id=node_id, depth=0))
+    if parent_id is not None:
+        db.execute(insert(models.NodeClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                models.NodeClosure.ancestor_id,
+                literal(node_id, Integer),
+                models.NodeClosure.depth + 1,
+            ).where(models.NodeClosure.descendant_id == parent_id)
+        ))
+
+# pg_advisory_xact_lock key serializing node moves (any fixed bigint)
+MOVE_NODE_LOCK = 0x4E4F4445
+
+def move_node(db: Session, node: models.Node, parent_id: Optional[int]) -> models.Node:
+    """Reparent ``node`` (and its whole subtree) under ``parent_id``."""
+    # Two concurrent moves can each pass the cycle check and together form a
+    # cycle (A under B, B under A), so moves take a transaction-level lock and
+    # check against the closure as committed by the previous one
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MOVE_NODE_LOCK})
+    db.refresh(node)  # its level may have changed while waiting
+    subtree = subtree_node_ids(node.id)
+    if parent_id is not None:
+        parent = get_node(db, parent_id)
+        if parent is None:
+            raise ValueError(f"Parent node {parent_id} not found")
+        if db.query(models.NodeClosure).filter(
+            models.NodeClosure.ancestor_id == node.id,
+            models.NodeClosure.descendant_id == parent_id
+        ).first():
+            raise ValueError("A node cannot be moved under its own subtree")
+        level_delta = parent.level + 1 - node.level
+    else:
+        level_delta = 1 - node.level
+
+    # Take the subtree's totals off its old ancestors
+    moved_counters, moved_breakdown = rollups.subtree_delta(db, node.id)
+    rollups.apply_delta(db, node.id, {k: -v for k, v in moved_counters.items()},
+                        {k: -v for k, v in moved_breakdown.items()}, strict=True)
+
+    # Detach the subtree from its old ancestors
+    old_ancestors = select(models.NodeClosure.ancestor_id).where(
+        models.NodeClosure.descendant_id == node.id,
+        models.NodeClosure.ancestor_id != node.id
+    )
+    db.execute(
+        delete(models.NodeClosure)
+        .where(models.NodeClosure.descendant_id.in_(subtree))
+        .where(models.NodeClosure.ancestor_id.in_(old_ancestors))
+        .execution_options(synchronize_session=False)
+    )
+    # Attach it to every ancestor of the new parent
+    if parent_id is not None:
+        above = aliased(models.NodeClosure)
+        below = aliased(models.NodeClosure)
+        db.execute(insert(models.NodeClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .where(above.descendant_id == parent_id)
+            .where(below.ancestor_id == node.id)
+        ))
+    rollups.apply_delta(db, node.id, moved_counters, moved_breakdown, strict=True)
+    if level_delta:
+        db.execute(
+            update(models.Node)
+            .where(models.Node.id.in_(subtree))
+            .values(level=models.Node.level + level_delta)
+            .execution_options(synchronize_session=False)
+        )
+    node.parent_id = parent_id
+    versions.bump_version(db, versions.HIERARCHY)
+    db.commit()
+    auth.invalidate_principals()
+    db.refresh(node)
+    return node
+
+def subtree_node_ids(node_id: int):
+    """Select of every node id in the subtree rooted at ``node_id`` (inclusive).
+
+    Use it as ``Model.node_id.in_(subtree_node_ids(node_id))`` so the scope is
+    resolved inside the same query instead of as a literal ``IN (...)`` list.
+    """
+    return select(models.NodeClosure.descendant_id).where(models.NodeClosure.ancestor_id == node_id)
+
+def get_descendant_node_ids(db: Session, node_id: int) -> List[int]:
+    return list(db.execute(subtree_node_ids(node_id)).scalars())
+
+def rebuild_node_closure(db: Session):
+    """Recompute the closure table from ``nodes.parent_id``."""
+    db.execute(delete(models.NodeClosure))
+    db.execute(text("""
+        INSERT INTO node_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM nodes
+            UNION ALL
+            SELECT tree.ancestor_id, nodes.id, tree.depth + 1
+            FROM tree JOIN nodes ON nodes.parent_id = tree.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+    """))
+    versions.bump_version(db, versions.HIERARCHY)
+    db.commit()
+    auth.invalidate_principals()
+
+def ensure_node_closure(db: Session):
+    """Backfill the closure table for databases created before it existed."""
+    has_closure = db.query(models.NodeClosure).first() is not None
+    has_nodes = db.query(models.Node).first() is not None
+    if has_nodes and not has_closure:
+        rebuild_node_closure(db)
+
 def get_node(db: Session, node_id: int) -> Optional[models.Node]:
     return db.query(models.Node).filter(models.Node.id == node_id).first()
 
-def get_nodes(db: Session, skip: int = 0, limit: int = 100) -> List[models.Node]:
-    return db.query(models.Node).offset(skip).limit(limit).all()
+def get_nodes(db: Session, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[models.Node], Optional[str]]:
+    return paginate(db.query(models.Node), models.Node, cursor, limit)
 
 # User CRUD
 
@@ -36,7 +209,9 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
         is_active=user.is_active
     )
     db.add(db_user)
+    versions.bump_version(db, versions.USERS)
     db.commit()
+    auth.invalidate_principals(db_user.username)
     db.refresh(db_user)
     return db_user
 
@@ -46,14 +221,17 @@ def get_user(db: Session, user_id: int) -> Optional[models.User]:
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[models.User], Optional[str]]:
+    return paginate(db.query(models.User), models.User, cursor, limit)
 
 # Risk CRUD
 
 def create_risk(db: Session, risk: schemas.RiskCreate) -> models.Risk:
     db_risk = models.Risk(**risk.dict())
     db.add(db_risk)
+    db.flush()
+    rollups.apply_delta(db, db_risk.node_id, *rollups.risk_delta(db_risk))
+    versions.bump_version(db, versions.RISKS)
     db.commit()
     db.refresh(db_risk)
     return db_risk
@@ -61,14 +239,19 @@ def create_risk(db: Session, risk: schemas.RiskCreate) -> models.Risk:
 def get_risk(db: Session, risk_id: int) -> Optional[models.Risk]:
     return db.query(models.Risk).filter(models.Risk.id == risk_id).first()
 
-def get_risks(db: Session, skip: int = 0, limit: int = 100) -> List[models.Risk]:
-    return db.query(models.Risk).offset(skip).limit(limit).all()
+def get_risks(db: Session, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id") -> Tuple[List[models.Risk], Optional[str]]:
+    return paginate(db.query(models.Risk), models.Risk, cursor, limit, order_by)
 
 # ActionItem CRUD
 
 def create_action_item(db: Session, action_item: schemas.ActionItemCreate) -> models.ActionItem:
     db_action_item = models.ActionItem(**action_item.dict())
     db.add(db_action_item)
+    db.flush()
+    node_id = db.query(models.Risk.node_id).filter(models.Risk.id == db_action_item.risk_id).scalar()
+    if node_id is not None:
+        rollups.apply_delta(db, node_id, *rollups.action_delta(db_action_item))
+    versions.bump_version(db, versions.ACTION_ITEMS)
     db.commit()
     db.refresh(db_action_item)
     return db_action_item
@@ -76,12 +259,18 @@ def create_action_item(db: Session, action_item: schemas.ActionItemCreate) -> mo
 def get_action_item(db: Session, action_item_id: int) -> Optional[models.ActionItem]:
     return db.query(models.ActionItem).filter(models.ActionItem.id == action_item_id).first()
 
-def get_action_items(db: Session, skip: int = 0, limit: int = 100) -> List[models.ActionItem]:
-    return db.query(models.ActionItem).offset(skip).limit(limit).all()
+def get_action_items(db: Session, cursor: Optional[str] = None, limit: int = 100, assigned_to: Optional[int] = None) -> Tuple[List[models.ActionItem], Optional[str]]:
+    query = db.query(models.ActionItem)
+    if assigned_to is not None:
+        query = query.filter(models.ActionItem.assigned_to == assigned_to)
+    return paginate(query, models.ActionItem, cursor, limit)
 
 def create_incident(db: Session, incident: schemas.IncidentCreate) -> models.Incident:
     db_incident = models.Incident(**incident.dict())
     db.add(db_incident)
+    db.flush()
+    rollups.apply_delta(db, db_incident.node_id, *rollups.incident_delta(db_incident))
+    versions.bump_version(db, versions.INCIDENTS)
     db.commit()
     db.refresh(db_incident)
     return db_incident
@@ -89,5 +278,112 @@ def create_incident(db: Session, incident: schemas.IncidentCreate) -> models.Inc
 def get_incident(db: Session, incident_id: int):
     return db.query(models.Incident).filter(models.Incident.id == incident_id).first()
 
-def get_incidents(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Incident).offset(skip).limit(limit).all()
+def get_incidents(db: Session, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id") -> Tuple[List[models.Incident], Optional[str]]:
+    return paginate(db.query(models.Incident), models.Incident, cursor, limit, order_by)
+
+# Scoped pages
+#
+# Newest-first pages of a subtree's risks and incidents for the HTMX pages,
+# with every filter applied in SQL.
+
+def _created_between(query: Query, model, created_from: Optional[datetime.date], created_to: Optional[datetime.date]) -> Query:
+    if created_from:
+        query = query.filter(model.created_at >= datetime.datetime.combine(created_from, datetime.time.min))
+    if created_to:
+        end = datetime.datetime.combine(created_to + datetime.timedelta(days=1), datetime.time.min)
+        query = query.filter(model.created_at < end)
+    return query
+
+def get_scoped_risks(db: Session, node_id: int, cursor: Optional[str] = None, limit: int = 25,
+                     status: Optional[str] = None, risk_type: Optional[str] = None,
+                     created_from: Optional[datetime.date] = None,
+                     created_to: Optional[datetime.date] = None) -> Tuple[List[models.Risk], Optional[str]]:
+    query = db.query(models.Risk).filter(models.Risk.node_id.in_(subtree_node_ids(node_id)))
+    if status:
+        query = query.filter(models.Risk.status == status)
+    if risk_type:
+        query = query.filter(models.Risk.risk_type == risk_type)
+    query = _created_between(query, models.Risk, created_from, created_to)
+    return paginate(query, models.Risk, cursor, limit, "-created_at")
+
+def get_scoped_incidents(db: Session, node_id: int, cursor: Optional[str] = None, limit: int = 25,
+                         is_financial: Optional[bool] = None,
+                         created_from: Optional[datetime.date] = None,
+                         created_to: Optional[datetime.date] = None) -> Tuple[List[models.Incident], Optional[str]]:
+    query = db.query(models.Incident).filter(models.Incident.node_id.in_(subtree_node_ids(node_id)))
+    if is_financial is not None:
+        query = query.filter(models.Incident.is_financial.is_(is_financial))
+    query = _created_between(query, models.Incident, created_from, created_to)
+    return paginate(query, models.Incident, cursor, limit, "-created_at")
+
+# Bulk creation
+#
+# Foreign keys of a whole batch are checked with one query per referenced
+# table; the valid rows go in with multi-row INSERT ... RETURNING statements
+# and a single rollup update per touched node, all in one transaction.
+# Invalid items are reported and skipped.
+
+BULK_MAX_ITEMS = 10000
+BULK_CHUNK_SIZE = 1000
+
+def _existing_ids(db: Session, column, ids) -> Dict[int, object]:
+    """Map each id in ``ids`` that exists to its row (id plus any extra columns)."""
+    rows = db.execute(select(column.table.c.id, column).where(column.table.c.id.in_(set(ids)))).all() if ids else []
+    return {row[0]: row[1] for row in rows}
+
+def _bulk_insert(db: Session, model, rows: List[dict]) -> List[int]:
+    ids = []
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_CHUNK_SIZE]
+        # RETURNING order is not guaranteed; sort_by_parameter_order maps each id back to its row
+        ids.extend(db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), chunk).scalars().all())
+    return ids
+
+def _bulk_create(db: Session, model, items: list, node_ids: List[Optional[int]], errors: List[Optional[str]], delta) -> dict:
+    started = time.perf_counter()
+    valid = [i for i, error in enumerate(errors) if error is None]
+    rows = [items[i].dict() for i in valid]
+    ids = _bulk_insert(db, model, rows) if rows else []
+    totals = {}
+    for i, row in zip(valid, rows):
+        rollups.merge_delta(totals.setdefault(node_ids[i], ({}, {})), delta(model(**row)))
+    for node_id, (counters, breakdown) in totals.items():
+        rollups.apply_delta(db, node_id, counters, breakdown)
+    if ids:
+        versions.bump_version(db, model.__tablename__)
+    db.commit()
+    results = [{"index": i, "id": None, "error": error} for i, error in enumerate(errors)]
+    for i, new_id in zip(valid, ids):
+        results[i]["id"] = new_id
+    elapsed = time.perf_counter() - started
+    return {
+        "created": len(ids),
+        "failed": len(items) - len(ids),
+        "results": results,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(len(ids) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def bulk_create_risks(db: Session, risks: List[schemas.RiskCreate]) -> dict:
+    nodes = _existing_ids(db, models.Node.id, [r.node_id for r in risks])
+    errors = [None if r.node_id in nodes else f"Node {r.node_id} not found" for r in risks]
+    return _bulk_create(db, models.Risk, risks, [r.node_id for r in risks], errors, rollups.risk_delta)
+
+def bulk_create_incidents(db: Session, incidents: List[schemas.IncidentCreate]) -> dict:
+    nodes = _existing_ids(db, models.Node.id, [i.node_id for i in incidents])
+    errors = [None if i.node_id in nodes else f"Node {i.node_id} not found" for i in incidents]
+    return _bulk_create(db, models.Incident, incidents, [i.node_id for i in incidents], errors, rollups.incident_delta)
+
+def bulk_create_action_items(db: Session, action_items: List[schemas.ActionItemCreate]) -> dict:
+    risk_nodes = _existing_ids(db, models.Risk.node_id, [a.risk_id for a in action_items])
+    users = _existing_ids(db, models.User.id, [a.assigned_to for a in action_items])
+    errors = []
+    for a in action_items:
+        if a.risk_id not in risk_nodes:
+            errors.append(f"Risk {a.risk_id} not found")
+        elif a.assigned_to not in users:
+            errors.append(f"User {a.assigned_to} not found")
+        else:
+            errors.append(None)
+    node_ids = [risk_nodes.get(a.risk_id) for a in action_items]
+    return _bulk_create(db, models.ActionItem, action_items, node_ids, errors, rollups.action_delta)
@@ -1,11 +1,14 @@
 import os
 import re
+import asyncio
 import psycopg2
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from fastapi import Request
 from urllib.parse import quote_plus  # new import
+from . import metrics, query_budget
 
 # Load environment variables from .env if present
 load_dotenv()
@@ -46,9 +49,21 @@ POSTGRES_USER_ENC = quote_plus(POSTGRES_USER)
 POSTGRES_PASSWORD_ENC = quote_plus(POSTGRES_PASSWORD)
 
 SQLALCHEMY_DATABASE_URL = (
-    f"postgresql://{POSTGRES_USER_ENC}:{POSTGRES_PASSWORD_ENC}"
+    f"postgresql+psycopg2://{POSTGRES_USER_ENC}:{POSTGRES_PASSWORD_ENC}"
     f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    f"postgresql+asyncpg://{POSTGRES_USER_ENC}:{POSTGRES_PASSWORD_ENC}"
+    f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+)
+
+# Connection pool settings (shared by the sync and async engines)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Serve the async routes from an asyncpg engine instead of the sync pool
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() in ("1", "true", "yes")
 
 # --- Create DB if not exists ---
 
@@ -79,14 +94,87 @@ create_database_if_not_exists()
 # --- End create DB logic ---
 
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+POOL_OPTIONS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **POOL_OPTIONS)
+metrics.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **POOL_OPTIONS)
+    metrics.instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 
-def get_db():
+def get_db(request: Request = None):
+    # ``request`` is None outside FastAPI (scripts calling next(get_db()))
     db = SessionLocal()
+    query_budget.track(db, request)
     try:
         yield db
+        query_budget.check(request)
     finally:
         db.close()
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Set USE_ASYNC_DB=true to use the async engine")
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+class DBRunner:
+    """Runs sync ORM code (crud, aggregates, ...) without blocking the event loop.
+
+    With USE_ASYNC_DB the function runs through ``AsyncSession.run_sync`` on
+    an asyncpg connection; otherwise it runs on a worker thread with a
+    regular Session. Either way ``fn`` receives a sync Session as its first
+    argument, so the same query code serves both engines.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        if AsyncSessionLocal is not None:
+            return await self.session.run_sync(lambda db: fn(db, *args, **kwargs))
+        return await asyncio.to_thread(fn, self.session, *args, **kwargs)
+
+    async def release(self):
+        """Return the session's connection to the pool early (e.g. before a long stream).
+
+        The session stays usable; a later ``run`` checks a connection out again.
+        """
+        if AsyncSessionLocal is not None:
+            await self.session.close()
+        else:
+            await asyncio.to_thread(self.session.close)
+
+
+async def get_db_runner(request: Request = None):
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            query_budget.track(session, request)
+            yield DBRunner(session)
+            query_budget.check(request)
+    else:
+        db = SessionLocal()
+        query_budget.track(db, request)
+        try:
+            yield DBRunner(db)
+            query_budget.check(request)
+        finally:
+            db.close()
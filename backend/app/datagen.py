@@ -0,0 +1,248 @@
+"""
+Deterministic bulk data generator for capacity testing.
+
+Builds an org hierarchy shaped like ``seed_data`` (Root -> regions -> ...
+-> business units) whose size is controlled by a scale factor, then loads
+nodes, closure rows, users, risks, action items and incidents with
+PostgreSQL ``COPY`` in a single transaction. The password is hashed once,
+ids are assigned up front (no per-row round trips) and AI text is off by
+default. Rollups are rebuilt from SQL afterwards.
+
+    python -m backend.app.datagen --scale 100 --seed 42
+"""
+import argparse
+import csv
+import datetime
+import io
+import random
+import time
+from . import crud, rollups, versions
+from .database import Base, SessionLocal, engine
+from .indexes import ensure_indexes
+from .seed_data import (
+    action_statuses, ai_or_template, business_unit_names, incident_names,
+    incident_root_causes, risk_statuses, risk_types, segments, usernames
+)
+
+DEFAULT_DEPTH = 6  # Root, region, subregion, country, segment, business unit
+DEFAULT_FANOUT = 4.0
+BASE_DATE = datetime.datetime(2024, 1, 1)
+DATE_SPREAD_SECONDS = 2 * 365 * 24 * 3600
+LEVEL_NAMES = {2: "Region", 3: "Subregion", 4: "Country", 5: None, 6: None}
+
+TABLES = {
+    "nodes": ["id", "name", "parent_id", "level"],
+    "node_closure": ["ancestor_id", "descendant_id", "depth"],
+    "users": ["id", "username", "email", "hashed_password", "node_id", "level", "is_active"],
+    "risks": ["id", "title", "description", "node_id", "risk_type", "status", "created_at"],
+    "action_items": ["id", "description", "risk_id", "assigned_to", "status", "due_date"],
+    "incidents": ["id", "name", "description", "root_cause", "loss_amount", "is_financial", "node_id", "created_at"],
+}
+
+
+class _CopyWriter:
+    """Buffers rows per table as CSV and streams them to COPY in batches.
+
+    Flushes always go through every table in ``TABLES`` order, so a row is
+    never copied before the rows its foreign keys point at.
+    """
+
+    def __init__(self, cursor, batch_size: int):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.buffers = {table: (io.StringIO(), [0]) for table in TABLES}
+        self.counts = {table: 0 for table in TABLES}
+
+    def add(self, table: str, row):
+        buffer, pending = self.buffers[table]
+        csv.writer(buffer).writerow(["" if v is None else v for v in row])
+        pending[0] += 1
+        self.counts[table] += 1
+        if pending[0] >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for name in TABLES:
+            buffer, pending = self.buffers[name]
+            if not pending[0]:
+                continue
+            buffer.seek(0)
+            self.cursor.copy_expert(
+                f"COPY {name} ({', '.join(TABLES[name])}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            self.buffers[name] = (io.StringIO(), [0])
+
+
+def _children_count(rng: random.Random, fanout: float) -> int:
+    # Fractional fanouts round up or down at random so the average is exact
+    whole = int(fanout)
+    return whole + (1 if rng.random() < fanout - whole else 0)
+
+
+def _node_name(level: int, depth: int, index: int, rng: random.Random) -> str:
+    if level == depth:
+        return f"{rng.choice(business_unit_names)} {index + 1}"
+    if level == depth - 1:
+        return segments[index % len(segments)] if index < len(segments) else f"Segment {index + 1}"
+    prefix = LEVEL_NAMES.get(level) or f"Level {level} Unit"
+    return f"{prefix} {index + 1}"
+
+
+def fanout_for_scale(scale: float, depth: int = DEFAULT_DEPTH) -> float:
+    """Fanout that makes the number of business units grow linearly with ``scale``."""
+    return max(1.0, DEFAULT_FANOUT * scale ** (1.0 / max(depth - 1, 1)))
+
+
+def generate(scale: float = 1.0, seed: int = 42, depth: int = DEFAULT_DEPTH, fanout: float = None,
+             rows_per_unit: float = 1.0, use_ai: bool = False, batch_size: int = 50000) -> dict:
+    """Reset the database and load a generated dataset; returns row counts and timings.
+
+    ``scale`` grows the number of business units linearly (via the fanout),
+    ``rows_per_unit`` multiplies the users/risks/incidents per business unit
+    relative to ``seed_data``'s ranges. The same arguments always produce the
+    same data.
+    """
+    rng = random.Random(seed)
+    fanout = fanout or fanout_for_scale(scale, depth)
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    hashed_password = crud.get_password_hash("P@ssw0rd")
+
+    def text_or_ai(prompt, fallback):
+        return ai_or_template(prompt, fallback) if use_ai else fallback
+
+    def per_unit(low, high):
+        return max(0, round(rng.randint(low, high) * rows_per_unit))
+
+    def timestamp():
+        return BASE_DATE + datetime.timedelta(seconds=rng.randrange(DATE_SPREAD_SECONDS))
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(
+            "TRUNCATE action_items, incidents, risks, users, node_rollup_breakdowns, "
+            "node_rollups, node_closure, nodes RESTART IDENTITY CASCADE"
+        )
+        writer = _CopyWriter(cursor, batch_size)
+        ids = {table: 0 for table in TABLES if table != "node_closure"}
+
+        def next_id(table):
+            ids[table] += 1
+            return ids[table]
+
+        # Depth-first walk; each stack entry is (node_id, level, ancestors incl. self, name path)
+        root_id = next_id("nodes")
+        writer.add("nodes", (root_id, "Root", None, 1))
+        writer.add("node_closure", (root_id, root_id, 0))
+        stack = [(root_id, 1, [root_id], [])]
+        while stack:
+            node_id, level, ancestors, path = stack.pop()
+            if level == depth:
+                _populate_business_unit(
+                    writer, next_id, rng, node_id, level, path, hashed_password,
+                    per_unit, timestamp, text_or_ai
+                )
+                continue
+            for index in range(_children_count(rng, fanout)):
+                child_id = next_id("nodes")
+                name = _node_name(level + 1, depth, index, rng)
+                writer.add("nodes", (child_id, name, node_id, level + 1))
+                child_ancestors = ancestors + [child_id]
+                for distance, ancestor_id in enumerate(reversed(child_ancestors)):
+                    writer.add("node_closure", (ancestor_id, child_id, distance))
+                stack.append((child_id, level + 1, child_ancestors, path + [name]))
+        writer.flush()
+
+        for table, last_id in ids.items():
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), {max(last_id, 1)}, {'true' if last_id else 'false'})"
+            )
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    loaded = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        rollups.rebuild_rollups(db)
+        versions.bump_all(db)
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "rows": writer.counts,
+        "fanout": round(fanout, 3),
+        "depth": depth,
+        "load_seconds": round(loaded - started, 2),
+        "rollup_seconds": round(time.perf_counter() - loaded, 2),
+    }
+
+
+def _populate_business_unit(writer, next_id, rng, node_id, level, path, hashed_password,
+                            per_unit, timestamp, text_or_ai):
+    where = ", ".join(reversed(path[-3:]))
+    user_ids = []
+    for _ in range(max(1, per_unit(1, 3))):
+        user_id = next_id("users")
+        username = f"{rng.choice(usernames)}{user_id}"
+        writer.add("users", (
+            user_id, username, f"{username}@testbank.com", hashed_password, node_id, level, "true"
+        ))
+        user_ids.append(user_id)
+    for r in range(per_unit(2, 5)):
+        rtype = rng.choice(risk_types)
+        risk_id = next_id("risks")
+        title = text_or_ai(
+            f"Generate a short risk title for a {rtype} risk in {where}",
+            f"{rtype.title()} Risk {r + 1}"
+        )
+        writer.add("risks", (
+            risk_id, title,
+            text_or_ai(f"Describe a {rtype} risk for {where}", f"Sample description for {rtype} risk in {where}."),
+            node_id, rtype, rng.choice(risk_statuses), timestamp()
+        ))
+        for a in range(rng.randint(1, 2)):
+            writer.add("action_items", (
+                next_id("action_items"),
+                text_or_ai(
+                    f"Suggest an action item for risk '{title}' in {where}",
+                    f"Action item {a + 1} for {title} in {where}."
+                ),
+                risk_id, user_ids[0], rng.choice(action_statuses), None
+            ))
+    for _ in range(per_unit(2, 4)):
+        is_financial = rng.random() < 0.5
+        name = rng.choice(incident_names)
+        writer.add("incidents", (
+            next_id("incidents"), name, f"{name} occurred in {where}.",
+            rng.choice(incident_root_causes),
+            round(rng.uniform(1000, 500000)) if is_financial else None,
+            "true" if is_financial else "false", node_id, timestamp()
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a generated dataset (resets the database).")
+    parser.add_argument("--scale", type=float, default=1.0, help="business units grow linearly with scale (1 = ~1k)")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="hierarchy levels including Root")
+    parser.add_argument("--fanout", type=float, help="children per node (overrides --scale)")
+    parser.add_argument("--rows-per-unit", type=float, default=1.0, help="multiplier for rows per business unit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ai", action="store_true", help="generate titles and descriptions with the AI provider")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+    result = generate(
+        scale=args.scale, seed=args.seed, depth=args.depth, fanout=args.fanout,
+        rows_per_unit=args.rows_per_unit, use_ai=args.ai, batch_size=args.batch_size
+    )
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Create model indexes that are missing from an existing database.
+
+``create_all`` skips existing tables, so ``Index``/``index=True``
+definitions added later never reach a database created before them. Run
+this once per deploy (not from app startup, where every worker would race
+to build the same index):
+
+    python -m backend.app.indexes
+
+Each index is built with ``CREATE INDEX CONCURRENTLY IF NOT EXISTS``, so
+writes to the table continue during the build. A concurrent build that was
+interrupted leaves an invalid index behind; it is dropped and rebuilt.
+"""
+import re
+import time
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from . import models  # noqa: F401 (registers the tables on Base.metadata)
+from .database import Base, engine
+
+_CREATE = re.compile(r"^CREATE (UNIQUE )?INDEX ")
+
+
+def _create_concurrently(conn, index) -> str:
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+    return _CREATE.sub(lambda m: f"CREATE {m.group(1) or ''}INDEX CONCURRENTLY ", ddl, count=1)
+
+
+def ensure_indexes(bind=None) -> dict:
+    """Build every declared index that is missing or invalid; returns what was built."""
+    bind = bind or engine
+    built, started = [], time.perf_counter()
+    # CONCURRENTLY cannot run inside a transaction block
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                valid = conn.execute(text(
+                    "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name"
+                ), {"name": index.name}).scalar()
+                if valid:
+                    continue
+                if valid is False:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                conn.execute(text(_create_concurrently(conn, index)))
+                built.append(index.name)
+    return {"built": built, "seconds": round(time.perf_counter() - started, 2)}
+
+
+if __name__ == "__main__":
+    print(ensure_indexes())
@@ -1,15 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from .database import engine, Base, get_db
-from .routes import users, nodes, risks, insights, incidents, action_items
+from fastapi import FastAPI, Depends, HTTPException, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
+from jose import jwt
+from .database import engine, Base, SessionLocal, DBRunner, get_db, get_db_runner
+from .routes import users, nodes, risks, insights, incidents, action_items, exports
 from .routes import insights as insights_router
 from .routes import users as users_router
 from .routes import nodes as nodes_router
 from .routes import risks as risks_router
-from . import crud, models, schemas, ai
+from . import crud, schemas, ai, rollups, metrics
+from .auth import authenticate_user, get_current_user, principal_cache
+from .compression import CompressionMiddleware
 import os
 from datetime import datetime, timedelta
 from fastapi.middleware.cors import CORSMiddleware
@@ -26,43 +26,12 @@ app.include_router(action_items.router)
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
-
-# Dependency for protected endpoints
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except Exception:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if user is None:
-        raise credentials_exception
-    return user
 
 app.include_router(users.router, dependencies=[Depends(get_current_user)])
 app.include_router(nodes.router, dependencies=[Depends(get_current_user)])
 app.include_router(risks.router, dependencies=[Depends(get_current_user)])
 app.include_router(insights.router, dependencies=[Depends(get_current_user)])
-
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
-        return None
-    return user
+app.include_router(exports.router, dependencies=[Depends(get_current_user)])
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -74,15 +43,16 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 
 @app.post("/token")
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: DBRunner = Depends(get_db_runner)):
+    # bcrypt runs on auth's bounded pool, not on the event loop
+    username = await authenticate_user(db, form_data.username, form_data.password)
+    if not username:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(data={"sub": username})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -97,10 +67,17 @@ def health_check():
         db_ok = False
     # Check AI
     try:
-        ai_ok = ai.get_insight("health check") is not None
+        ai_ok = ai.get_insight("health check", use_cache=False) is not None
     except Exception:
         ai_ok = False
-    return {"db": db_ok, "ai": ai_ok}
+    return {"db": db_ok, "ai": ai_ok, "ai_cache": ai.cache_stats(), "ai_models": ai.registry_stats(), "principal_cache": principal_cache.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.get("/")
@@ -111,8 +88,18 @@ def read_root():
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        crud.ensure_node_closure(db)
+        rollups.ensure_rollups(db)
+    finally:
+        db.close()
+    if ai.AI_PRELOAD:
+        ai.warm_up()
 
 
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # or ["http://localhost:3000"]
@@ -121,6 +108,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so request timings include CORS and compression
+app.add_middleware(metrics.MetricsMiddleware, app_name="api")
+
 
 if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
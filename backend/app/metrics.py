@@ -0,0 +1,198 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Three sources feed the registry:
+
+* ``MetricsMiddleware``: request latency by app, method, route template and
+  status, plus the number of SQL statements each request issued.
+* SQLAlchemy engine events (``instrument_engine``): statement latency by
+  operation.
+* ``ai_call``: AI provider call latency and errors by provider.
+
+Everything is kept in plain dicts behind one lock, so an observation costs
+a bisect and two additions; ``GET /metrics`` renders the current values.
+Counters are per process: with several workers, scrape each one.
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+AI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_lock = threading.Lock()
+# Statements issued by the current request; a mutable holder so worker threads
+# (DBRunner, threadpool routes) that copy the context add to the same count
+_request_queries: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_queries", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ["app", "method", "route", "status"]
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements issued per HTTP request.", ["app", "route"], COUNT_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement latency.", ["operation"], DB_BUCKETS
+)
+AI_CALL_LATENCY = Histogram(
+    "ai_call_duration_seconds", "AI provider call latency (cache misses only).", ["provider", "operation"], AI_BUCKETS
+)
+AI_CALL_ERRORS = Counter(
+    "ai_call_errors_total", "AI provider calls that raised (including timeouts).", ["provider", "operation"]
+)
+REGISTRY = [REQUEST_LATENCY, REQUEST_QUERIES, DB_QUERY_LATENCY, AI_CALL_LATENCY, AI_CALL_ERRORS]
+
+
+def render() -> str:
+    with _lock:
+        lines = [line for metric in REGISTRY for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+# --- HTTP ---
+
+class MetricsMiddleware:
+    """Times every HTTP request and counts its SQL statements."""
+
+    def __init__(self, app, app_name: str = "app"):
+        self.app = app
+        self.app_name = app_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        status = [500]
+        queries = [0]
+        token = _request_queries.set(queries)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_queries.reset(token)
+            # The route template (not the raw path) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            REQUEST_LATENCY.observe(elapsed, self.app_name, scope["method"], route, str(status[0]))
+            REQUEST_QUERIES.observe(queries[0], self.app_name, route)
+
+
+# --- Database ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Stored on the per-execution context, so failed statements leave nothing behind
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        operation = "OTHER"
+    DB_QUERY_LATENCY.observe(elapsed, operation)
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def instrument_engine(engine):
+    """Attach the statement timers to ``engine`` (a sync Engine; pass ``async_engine.sync_engine``)."""
+    from sqlalchemy import event
+
+    if not METRICS_ENABLED or event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- AI ---
+
+@contextmanager
+def ai_call(provider: str, operation: str):
+    """Time one provider call; exceptions count as errors, cancellation does not."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        AI_CALL_ERRORS.inc(provider, operation)
+        raise
+    finally:
+        AI_CALL_LATENCY.observe(time.perf_counter() - started, provider, operation)
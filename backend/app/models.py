@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, DateTime, Boolean, Text
+    Column, Integer, BigInteger, String, ForeignKey, DateTime, Boolean, Text, Index
 )
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -10,7 +10,7 @@ class Node(Base):
     __tablename__ = "nodes"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    parent_id = Column(Integer, ForeignKey("nodes.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("nodes.id"), nullable=True, index=True)
     level = Column(Integer, nullable=False)
 
     parent = relationship("Node", remote_side=[id], backref="children")
@@ -29,7 +29,7 @@ class User(Base):
         String, nullable=False
     )
     node_id = Column(
-        Integer, ForeignKey("nodes.id")
+        Integer, ForeignKey("nodes.id"), index=True
     )
     level = Column(Integer, nullable=False)
     is_active = Column(Boolean, default=True)
@@ -51,12 +51,19 @@ class Risk(Base):
     node = relationship("Node", back_populates="risks")
     action_items = relationship("ActionItem", back_populates="risk")
 
+    __table_args__ = (
+        # Scoped "most recent" lists: node filter, then (created_at, id) order
+        Index("ix_risks_node_id_created_at", "node_id", "created_at", "id"),
+        # Keyset pagination with order_by=created_at
+        Index("ix_risks_created_at_id", "created_at", "id"),
+    )
+
 
 class ActionItem(Base):
     __tablename__ = "action_items"
     id = Column(Integer, primary_key=True, index=True)
     description = Column(Text, nullable=False)
-    risk_id = Column(Integer, ForeignKey("risks.id"))
+    risk_id = Column(Integer, ForeignKey("risks.id"), index=True)
     assigned_to = Column(Integer, ForeignKey("users.id"))
     status = Column(String)
     due_date = Column(DateTime)
@@ -64,6 +71,11 @@ class ActionItem(Base):
     risk = relationship("Risk", back_populates="action_items")
     assigned_to_user = relationship("User", back_populates="action_items")
 
+    __table_args__ = (
+        # "My actions" pages: assignee filter paginated by id
+        Index("ix_action_items_assigned_to_id", "assigned_to", "id"),
+    )
+
 
 class Incident(Base):
     __tablename__ = "incidents"
@@ -77,3 +89,49 @@ class Incident(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     node = relationship("Node", backref="incidents")
+
+    __table_args__ = (
+        Index("ix_incidents_node_id_created_at", "node_id", "created_at", "id"),
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+    )
+
+
+class NodeClosure(Base):
+    """Ancestor/descendant pairs for the Node hierarchy (closure table).
+
+    Every node has a self row at depth 0 plus one row per ancestor, so the
+    whole subtree of a node is a single indexed lookup on ``ancestor_id``.
+    """
+    __tablename__ = "node_closure"
+    ancestor_id = Column(Integer, ForeignKey("nodes.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("nodes.id"), primary_key=True, index=True)
+    depth = Column(Integer, nullable=False)
+
+
+class NodeRollup(Base):
+    """Per-subtree totals for a node, kept current by the crud writers."""
+    __tablename__ = "node_rollups"
+    node_id = Column(Integer, ForeignKey("nodes.id"), primary_key=True)
+    risk_count = Column(Integer, nullable=False, default=0, server_default="0")
+    incident_count = Column(Integer, nullable=False, default=0, server_default="0")
+    financial_incident_count = Column(Integer, nullable=False, default=0, server_default="0")
+    financial_loss = Column(BigInteger, nullable=False, default=0, server_default="0")
+    action_count = Column(Integer, nullable=False, default=0, server_default="0")
+    open_action_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class NodeRollupBreakdown(Base):
+    """Per-subtree risk counts by ``status`` and ``type``."""
+    __tablename__ = "node_rollup_breakdowns"
+    node_id = Column(Integer, ForeignKey("nodes.id"), primary_key=True)
+    dimension = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class DataVersion(Base):
+    """Monotonic change counters, bumped by the crud writers."""
+    __tablename__ = "data_versions"
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
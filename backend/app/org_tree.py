@@ -0,0 +1,75 @@
+"""
+Organization tree, loaded on demand.
+
+``/node-tree`` renders only the top ``TREE_INITIAL_LEVELS`` levels (one
+query per level, cached in process until the hierarchy version changes);
+deeper levels are fetched one parent at a time when the user expands a
+node. Every node carries its ``child_count`` so the UI knows which nodes
+can be expanded.
+"""
+import os
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+from typing import List, Optional
+from . import models, versions
+
+TREE_INITIAL_LEVELS = int(os.getenv("TREE_INITIAL_LEVELS", "2"))
+
+_snapshot = (None, [])  # (hierarchy version, top levels), replaced atomically
+
+
+def _child_rows(db: Session, parent_ids: Optional[List[int]]):
+    # Direct children of ``parent_ids`` (roots when None), each with its own child count
+    child = aliased(models.Node)
+    child_count = (
+        select(func.count(child.id))
+        .where(child.parent_id == models.Node.id)
+        .correlate(models.Node)
+        .scalar_subquery()
+    )
+    query = db.query(
+        models.Node.id, models.Node.name, models.Node.level, models.Node.parent_id,
+        child_count.label("child_count")
+    )
+    if parent_ids is None:
+        query = query.filter(models.Node.parent_id.is_(None))
+    else:
+        query = query.filter(models.Node.parent_id.in_(parent_ids))
+    return query.order_by(models.Node.id).all()
+
+
+def _item(row) -> dict:
+    # ``children`` stays None until loaded; the template then fetches it on expand
+    return {"id": row.id, "name": row.name, "level": row.level, "child_count": row.child_count, "children": None}
+
+
+def get_children(db: Session, parent_id: int) -> List[dict]:
+    """The direct children of ``parent_id``, unexpanded."""
+    return [_item(row) for row in _child_rows(db, [parent_id])]
+
+
+def get_top_levels(db: Session, levels: int = TREE_INITIAL_LEVELS) -> List[dict]:
+    """The first ``levels`` levels of the tree, nested; cached per hierarchy version."""
+    global _snapshot
+    version = versions.get_version(db, versions.HIERARCHY)
+    cached_version, tree = _snapshot
+    if cached_version == (version, levels):
+        return tree
+    # No lock around the queries: under AsyncSession.run_sync this runs on the
+    # event loop thread, and concurrent rebuilds are harmless anyway.
+    tree = [_item(row) for row in _child_rows(db, None)]
+    frontier = {item["id"]: item for item in tree}
+    for _ in range(levels - 1):
+        expandable = [node_id for node_id, item in frontier.items() if item["child_count"]]
+        for item in frontier.values():
+            item["children"] = []
+        if not expandable:
+            break
+        next_frontier = {}
+        for row in _child_rows(db, expandable):
+            item = _item(row)
+            frontier[row.parent_id]["children"].append(item)
+            next_frontier[row.id] = item
+        frontier = next_frontier
+    _snapshot = ((version, levels), tree)
+    return tree
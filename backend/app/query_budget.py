@@ -0,0 +1,125 @@
+"""
+Per-request SQL statement budgets and N+1 detection, for development and tests.
+
+With ``QUERY_BUDGET_MODE=warn`` or ``raise``, every session handed out by
+``get_db``/``get_db_runner`` records the statements it sends on behalf of
+the current request. When the request's dependencies are torn down, the log
+is checked against the route's budget: ``@query_budget.budget(12)`` on the
+endpoint, otherwise ``QUERY_BUDGET_DEFAULT``.
+
+Statements are also grouped by shape (the SQL with bound values and
+literals replaced by ``?`` and ``IN`` lists collapsed). One shape sent more
+than ``QUERY_REPEAT_LIMIT`` times in a request is the usual N+1 signature,
+a lazy load per row, and breaks the budget as well.
+
+``warn`` logs the offending request; ``raise`` raises ``QueryBudgetExceeded``,
+which ``TestClient`` re-raises, so the test fails. The default, ``off``,
+installs no listeners at all.
+"""
+import logging
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off").lower()
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "30"))
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, message: str, log: "QueryLog"):
+        super().__init__(message)
+        self.log = log
+
+
+def enabled() -> bool:
+    return QUERY_BUDGET_MODE in ("warn", "raise")
+
+
+def statement_shape(statement: str) -> str:
+    """``statement`` with values replaced by ``?``, so per-row repeats compare equal."""
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _LIST.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryLog:
+    """Statements sent for one request, across every session it opened."""
+
+    def __init__(self):
+        self.statements = 0
+        self.shapes: Counter = Counter()
+        self.checked = False
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, limit: int = QUERY_REPEAT_LIMIT) -> List[Tuple[str, int]]:
+        """Shapes sent more than ``limit`` times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
+
+
+def budget(max_statements: int, max_repeats: Optional[int] = None):
+    """Declare a route's query budget; apply below the ``@app.get(...)`` decorator."""
+    def decorate(endpoint):
+        endpoint.__query_budget__ = (max_statements, max_repeats)
+        return endpoint
+    return decorate
+
+
+def _after_begin(session, transaction, connection):
+    # Each session transaction gets its own Connection, so the listener goes
+    # away with it instead of lingering on a pooled connection
+    log = session.info.get("query_log")
+    if log is not None and not event.contains(connection, "before_cursor_execute", log.record):
+        event.listen(connection, "before_cursor_execute", log.record)
+
+
+def track(session, request) -> Optional[QueryLog]:
+    """Record ``session``'s statements in the log of ``request`` (no-op when disabled)."""
+    if not enabled() or request is None:
+        return None
+    log = getattr(request.state, "query_log", None)
+    if log is None:
+        log = request.state.query_log = QueryLog()
+    session = getattr(session, "sync_session", session)  # AsyncSession
+    session.info["query_log"] = log
+    event.listen(session, "after_begin", _after_begin)
+    return log
+
+
+def check(request):
+    """Compare the request's log with its route's budget; warn or raise when over."""
+    log = getattr(request.state, "query_log", None) if request is not None else None
+    if log is None or log.checked:
+        return
+    log.checked = True
+    route = request.scope.get("route")
+    max_statements, max_repeats = getattr(
+        getattr(route, "endpoint", None), "__query_budget__", (QUERY_BUDGET_DEFAULT, None)
+    )
+    repeated = log.repeated(QUERY_REPEAT_LIMIT if max_repeats is None else max_repeats)
+    if log.statements <= max_statements and not repeated:
+        return
+    path = getattr(route, "path", None) or request.url.path
+    message = f"{request.method} {path}: {log.statements} SQL statements (budget {max_statements})"
+    if repeated:
+        message += "; repeated statements (likely N+1):" + "".join(
+            f"\n  {count}x {shape[:200]}" for shape, count in repeated
+        )
+    if QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(message, log)
+    logger.warning(message)
@@ -0,0 +1,182 @@
+"""
+Per-node subtree rollups.
+
+``node_rollups`` holds running totals for every node's subtree and
+``node_rollup_breakdowns`` the risk counts by status and type. Writers call
+``apply_delta`` inside their transaction, which adds the change to the node
+and all of its ancestors through the closure table. ``rebuild_rollups``
+recomputes everything from the base tables; run it with
+
+    python -m backend.app.rollups
+"""
+from sqlalchemy import Integer, String, delete, literal, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple
+from . import models
+
+COUNTERS = (
+    "risk_count",
+    "incident_count",
+    "financial_incident_count",
+    "financial_loss",
+    "action_count",
+    "open_action_count",
+)
+
+Breakdown = Dict[Tuple[str, str], int]
+
+
+def risk_delta(risk: models.Risk) -> Tuple[dict, Breakdown]:
+    return {"risk_count": 1}, {("status", risk.status or ""): 1, ("type", risk.risk_type or ""): 1}
+
+
+def incident_delta(incident: models.Incident) -> Tuple[dict, Breakdown]:
+    counters = {"incident_count": 1}
+    if incident.is_financial:
+        counters["financial_incident_count"] = 1
+        counters["financial_loss"] = incident.loss_amount or 0  # already an int (IncidentCreate rounds it)
+    return counters, {}
+
+
+def action_delta(action: models.ActionItem) -> Tuple[dict, Breakdown]:
+    counters = {"action_count": 1}
+    if action.status == "open":
+        counters["open_action_count"] = 1
+    return counters, {}
+
+
+def merge_delta(total: Tuple[dict, Breakdown], delta: Tuple[dict, Breakdown]):
+    """Accumulate ``delta`` into ``total`` in place (used for batched writes)."""
+    for key, value in delta[0].items():
+        total[0][key] = total[0].get(key, 0) + value
+    for key, value in delta[1].items():
+        total[1][key] = total[1].get(key, 0) + value
+
+
+def _ancestor_rows(node_id: int, strict: bool, *columns):
+    query = select(models.NodeClosure.ancestor_id, *columns).where(models.NodeClosure.descendant_id == node_id)
+    if strict:
+        query = query.where(models.NodeClosure.depth > 0)
+    return query
+
+
+def apply_delta(db: Session, node_id: int, counters: dict, breakdown: Optional[Breakdown] = None, strict: bool = False):
+    """Add ``counters``/``breakdown`` to ``node_id`` and every ancestor.
+
+    With ``strict=True`` the node itself is left untouched (used when a
+    subtree is moved and only the ancestors above it change).
+    """
+    counters = {k: v for k, v in counters.items() if v}
+    if counters:
+        stmt = pg_insert(models.NodeRollup).from_select(
+            ["node_id"] + list(counters),
+            _ancestor_rows(node_id, strict, *[literal(v, Integer) for v in counters.values()])
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.NodeRollup.node_id],
+            set_={k: getattr(models.NodeRollup, k) + getattr(stmt.excluded, k) for k in counters}
+        )
+        db.execute(stmt)
+    for (dimension, value), count in (breakdown or {}).items():
+        if not count:
+            continue
+        stmt = pg_insert(models.NodeRollupBreakdown).from_select(
+            ["node_id", "dimension", "value", "count"],
+            _ancestor_rows(
+                node_id, strict,
+                literal(dimension, String), literal(value, String), literal(count, Integer)
+            )
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                models.NodeRollupBreakdown.node_id,
+                models.NodeRollupBreakdown.dimension,
+                models.NodeRollupBreakdown.value,
+            ],
+            set_={"count": models.NodeRollupBreakdown.count + stmt.excluded.count}
+        )
+        db.execute(stmt)
+
+
+def subtree_delta(db: Session, node_id: int, sign: int = 1) -> Tuple[dict, Breakdown]:
+    """The current totals of ``node_id``'s subtree, as a delta (optionally negated)."""
+    counters = {}
+    rollup = db.get(models.NodeRollup, node_id)
+    if rollup is not None:
+        counters = {k: sign * (getattr(rollup, k) or 0) for k in COUNTERS}
+    breakdown = {
+        (row.dimension, row.value): sign * row.count
+        for row in db.query(models.NodeRollupBreakdown).filter(models.NodeRollupBreakdown.node_id == node_id)
+    }
+    return counters, breakdown
+
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup row from the base tables in one pass."""
+    db.execute(delete(models.NodeRollupBreakdown))
+    db.execute(delete(models.NodeRollup))
+    db.execute(text("""
+        INSERT INTO node_rollups (
+            node_id, risk_count, incident_count, financial_incident_count,
+            financial_loss, action_count, open_action_count
+        )
+        WITH risk_stats AS (
+            SELECT node_id, COUNT(*) AS risk_count
+            FROM risks GROUP BY node_id
+        ), incident_stats AS (
+            SELECT node_id,
+                   COUNT(*) AS incident_count,
+                   COUNT(*) FILTER (WHERE is_financial) AS financial_incident_count,
+                   COALESCE(SUM(loss_amount) FILTER (WHERE is_financial), 0) AS financial_loss
+            FROM incidents GROUP BY node_id
+        ), action_stats AS (
+            SELECT risks.node_id,
+                   COUNT(*) AS action_count,
+                   COUNT(*) FILTER (WHERE action_items.status = 'open') AS open_action_count
+            FROM action_items JOIN risks ON risks.id = action_items.risk_id
+            GROUP BY risks.node_id
+        )
+        SELECT node_closure.ancestor_id,
+               COALESCE(SUM(risk_stats.risk_count), 0),
+               COALESCE(SUM(incident_stats.incident_count), 0),
+               COALESCE(SUM(incident_stats.financial_incident_count), 0),
+               COALESCE(SUM(incident_stats.financial_loss), 0),
+               COALESCE(SUM(action_stats.action_count), 0),
+               COALESCE(SUM(action_stats.open_action_count), 0)
+        FROM node_closure
+        LEFT JOIN risk_stats ON risk_stats.node_id = node_closure.descendant_id
+        LEFT JOIN incident_stats ON incident_stats.node_id = node_closure.descendant_id
+        LEFT JOIN action_stats ON action_stats.node_id = node_closure.descendant_id
+        GROUP BY node_closure.ancestor_id
+    """))
+    db.execute(text("""
+        INSERT INTO node_rollup_breakdowns (node_id, dimension, value, count)
+        SELECT node_closure.ancestor_id, 'status', COALESCE(risks.status, ''), COUNT(*)
+        FROM node_closure JOIN risks ON risks.node_id = node_closure.descendant_id
+        GROUP BY node_closure.ancestor_id, COALESCE(risks.status, '')
+        UNION ALL
+        SELECT node_closure.ancestor_id, 'type', COALESCE(risks.risk_type, ''), COUNT(*)
+        FROM node_closure JOIN risks ON risks.node_id = node_closure.descendant_id
+        GROUP BY node_closure.ancestor_id, COALESCE(risks.risk_type, '')
+    """))
+    db.commit()
+
+
+def ensure_rollups(db: Session):
+    """Build the rollups for databases created before they existed."""
+    has_rollups = db.query(models.NodeRollup).first() is not None
+    has_nodes = db.query(models.Node).first() is not None
+    if has_nodes and not has_rollups:
+        rebuild_rollups(db)
+
+
+if __name__ == "__main__":
+    from .database import Base, engine, SessionLocal
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+    finally:
+        db.close()
+    print("Node rollups rebuilt.")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from .. import schemas, crud, models
 from ..database import get_db
@@ -6,12 +6,17 @@ from typing import List, Optional
 
 router = APIRouter(prefix="/action_items", tags=["action_items"])
 
-@router.get("/", response_model=List[schemas.ActionItem])
-def get_action_items(assigned_to: Optional[int] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    query = db.query(models.ActionItem)
-    if assigned_to is not None:
-        query = query.filter(models.ActionItem.assigned_to == assigned_to)
-    return query.offset(skip).limit(limit).all()
+@router.get("/", response_model=schemas.Page[schemas.ActionItem])
+def get_action_items(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), assigned_to: Optional[int] = None, db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = crud.get_action_items(db, cursor=cursor, limit=limit, assigned_to=assigned_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_action_items(action_items: List[schemas.ActionItemCreate] = Body(..., max_length=crud.BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    return crud.bulk_create_action_items(db, action_items)
 
 @router.get("/{action_item_id}", response_model=schemas.ActionItem)
 def get_action_item(action_item_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .. import crud, models
+from ..auth import Principal, get_current_user
+from ..database import engine, get_db
+from typing import Literal
+import csv
+import datetime
+import io
+import json
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+DATASETS = {
+    "risks": [
+        models.Risk.id, models.Risk.title, models.Risk.description, models.Risk.node_id,
+        models.Risk.risk_type, models.Risk.status, models.Risk.created_at,
+    ],
+    "incidents": [
+        models.Incident.id, models.Incident.name, models.Incident.description, models.Incident.root_cause,
+        models.Incident.loss_amount, models.Incident.is_financial, models.Incident.node_id,
+        models.Incident.created_at,
+    ],
+    "action_items": [
+        models.ActionItem.id, models.ActionItem.description, models.ActionItem.risk_id,
+        models.Risk.node_id, models.ActionItem.assigned_to, models.ActionItem.status,
+        models.ActionItem.due_date,
+    ],
+}
+
+
+def _dataset_query(dataset: str, node_id: int):
+    node_ids = crud.subtree_node_ids(node_id)
+    query = select(*DATASETS[dataset])
+    if dataset == "action_items":
+        query = query.join(models.Risk, models.Risk.id == models.ActionItem.risk_id)
+        return query.where(models.Risk.node_id.in_(node_ids)).order_by(models.ActionItem.id)
+    model = models.Risk if dataset == "risks" else models.Incident
+    return query.where(model.node_id.in_(node_ids)).order_by(model.id)
+
+
+def _stream_rows(dataset: str, node_id: int):
+    """Yield batches of row mappings from a server-side cursor.
+
+    Opens its own connection: the request's session is closed before a
+    streaming response finishes.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(_dataset_query(dataset, node_id))
+        for batch in result.yield_per(EXPORT_BATCH_SIZE).mappings().partitions():
+            yield batch
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _ndjson(datasets, node_id: int):
+    for dataset in datasets:
+        for batch in _stream_rows(dataset, node_id):
+            lines = []
+            for row in batch:
+                record = dict(row)
+                if len(datasets) > 1:
+                    record["type"] = dataset
+                lines.append(json.dumps(record, default=_json_default))
+            yield "\n".join(lines) + "\n"
+
+
+def _csv(dataset: str, node_id: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in DATASETS[dataset]])
+    yield buffer.getvalue()
+    for batch in _stream_rows(dataset, node_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([
+            [value.isoformat() if isinstance(value, datetime.datetime) else value for value in row.values()]
+            for row in batch
+        ])
+        yield buffer.getvalue()
+
+
+@router.get("/{node_id}/{dataset}")
+def export_subtree(
+    node_id: int,
+    dataset: Literal["risks", "incidents", "action_items", "all"],
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_user),
+):
+    """Stream every row of ``dataset`` in the subtree of ``node_id`` (memory stays constant)."""
+    if not user.can_access(db, node_id):
+        raise HTTPException(status_code=403, detail="Node is outside your scope")
+    if crud.get_node(db, node_id) is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    if format == "csv":
+        if dataset == "all":
+            raise HTTPException(status_code=400, detail="CSV exports cover one dataset at a time")
+        body, media_type = _csv(dataset, node_id), "text/csv"
+    else:
+        datasets = list(DATASETS) if dataset == "all" else [dataset]
+        body, media_type = _ndjson(datasets, node_id), "application/x-ndjson"
+    filename = f"node-{node_id}-{dataset}.{format}"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
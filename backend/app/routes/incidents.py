@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from .. import schemas, crud, models
+from .. import schemas, crud, models, conditional, versions
 from ..database import get_db
-from typing import List
+from typing import List, Literal, Optional
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
@@ -10,6 +10,10 @@ router = APIRouter(prefix="/incidents", tags=["incidents"])
 def create_incident(incident: schemas.IncidentCreate, db: Session = Depends(get_db)):
     return crud.create_incident(db=db, incident=incident)
 
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_incidents(incidents: List[schemas.IncidentCreate] = Body(..., max_length=crud.BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    return crud.bulk_create_incidents(db, incidents)
+
 @router.get("/{incident_id}", response_model=schemas.Incident)
 def get_incident(incident_id: int, db: Session = Depends(get_db)):
     db_incident = crud.get_incident(db, incident_id=incident_id)
@@ -17,6 +21,15 @@ def get_incident(incident_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Incident not found")
     return db_incident
 
-@router.get("/", response_model=List[schemas.Incident])
-def get_incidents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_incidents(db, skip=skip, limit=limit) 
\ No newline at end of file
+@router.get("/", response_model=schemas.Page[schemas.Incident])
+def get_incidents(request: Request, response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), order_by: Literal["id", "created_at"] = "id", db: Session = Depends(get_db)):
+    # Unchanged incidents table: 304 before any rows are loaded
+    validators = conditional.compute_validators(db, [versions.INCIDENTS], conditional.request_scope(request))
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    conditional.apply(response, validators)
+    try:
+        items, next_cursor = crud.get_incidents(db, cursor=cursor, limit=limit, order_by=order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor} 
\ No newline at end of file
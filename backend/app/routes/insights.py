@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from .. import ai, schemas, crud, models
+from .. import ai, schemas, crud, models, aggregates, summarization
 from ..database import get_db
 from typing import List, Optional
-import pandas as pd
 
 router = APIRouter(prefix="/insights", tags=["insights"])
 
@@ -12,15 +11,6 @@ def generate_insight(text: str, db: Session = Depends(get_db)):
     # Placeholder for AI-generated insight
     return {"insight": ai.get_insight(text)}
 
-# Helper to recursively collect all descendant node IDs
-def get_descendant_node_ids(node, collected=None):
-    if collected is None:
-        collected = set()
-    collected.add(node.id)
-    for child in node.children:
-        get_descendant_node_ids(child, collected)
-    return collected
-
 @router.get("/")
 def get_insights(node_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
     from ..ai import AI_PROVIDER
@@ -28,48 +18,55 @@ def get_insights(node_id: Optional[int] = Query(None), db: Session = Depends(get
         node = db.query(models.Node).filter(models.Node.id == node_id).first()
         if not node:
             return [{"insight": f"Node {node_id} not found."}]
-        # Get all descendant node IDs
-        node_ids = get_descendant_node_ids(node)
-    else:
-        # All nodes
-        node_ids = [n.id for n in db.query(models.Node).all()]
-
-    # Aggregate data for all relevant nodes
-    risks = db.query(models.Risk).filter(models.Risk.node_id.in_(node_ids)).all()
-    incidents = db.query(models.Incident).filter(models.Incident.node_id.in_(node_ids)).all()
-    actions = db.query(models.ActionItem).join(models.Risk).filter(models.Risk.node_id.in_(node_ids)).all()
 
-    # Convert to DataFrames
-    risks_df = pd.DataFrame([{
-        "id": r.id, "title": r.title, "description": r.description, "risk_type": r.risk_type, "status": r.status, "created_at": r.created_at
-    } for r in risks])
-    incidents_df = pd.DataFrame([{
-        "id": i.id, "name": i.name, "description": i.description, "root_cause": i.root_cause, "loss_amount": i.loss_amount, "is_financial": i.is_financial, "created_at": i.created_at
-    } for i in incidents])
-    actions_df = pd.DataFrame([{
-        "id": a.id, "description": a.description, "status": a.status, "due_date": a.due_date
-    } for a in actions])
+    scope_id = node_id or None
 
     if AI_PROVIDER == "hf_transformers":
-        risk_insight = ai.get_insight("Summarize the risk landscape for this scope.", table=risks_df, task="summarization") if not risks_df.empty else "No risks."
-        incident_insight = ai.get_insight("Summarize the incident landscape for this scope.", table=incidents_df, task="summarization") if not incidents_df.empty else "No incidents."
-        action_insight = ai.get_insight("Summarize the action items for this scope.", table=actions_df, task="summarization") if not actions_df.empty else "No actions."
+        import pandas as pd  # only needed (and only paid for) on the transformers path
+
+        # Table summarization needs the full rows of the subtree
+        risks_query = db.query(models.Risk)
+        incidents_query = db.query(models.Incident)
+        actions_query = db.query(models.ActionItem).join(models.Risk)
+        if scope_id:
+            node_ids = crud.subtree_node_ids(scope_id)
+            risks_query = risks_query.filter(models.Risk.node_id.in_(node_ids))
+            incidents_query = incidents_query.filter(models.Incident.node_id.in_(node_ids))
+            actions_query = actions_query.filter(models.Risk.node_id.in_(node_ids))
+
+        # Convert to DataFrames
+        risks_df = pd.DataFrame([{
+            "id": r.id, "title": r.title, "description": r.description, "risk_type": r.risk_type, "status": r.status, "created_at": r.created_at
+        } for r in risks_query.all()])
+        incidents_df = pd.DataFrame([{
+            "id": i.id, "name": i.name, "description": i.description, "root_cause": i.root_cause, "loss_amount": i.loss_amount, "is_financial": i.is_financial, "created_at": i.created_at
+        } for i in incidents_query.all()])
+        actions_df = pd.DataFrame([{
+            "id": a.id, "description": a.description, "status": a.status, "due_date": a.due_date
+        } for a in actions_query.all()])
+
+        # All three tables are chunked and summarized in shared batched pipeline calls
+        tables = {name: df for name, df in (("risks", risks_df), ("incidents", incidents_df), ("actions", actions_df)) if not df.empty}
+        summaries = summarization.summarize_tables(tables) if tables else {}
+        risk_insight = summaries.get("risks", "No risks.")
+        incident_insight = summaries.get("incidents", "No incidents.")
+        action_insight = summaries.get("actions", "No actions.")
         return [{
             "scope": "all" if not node_id else f"node {node_id} and descendants",
             "risk_insight": risk_insight,
             "incident_insight": incident_insight,
             "action_insight": action_insight
         }]
-    # Fallback: original summary prompt for other providers
-    if node_id:
-        node = db.query(models.Node).filter(models.Node.id == node_id).first()
-        node_name = node.name if node else f"Node {node_id}"
-    else:
-        node_name = "All Nodes"
+    # Fallback: original summary prompt for other providers, from SQL aggregates
+    summary = aggregates.subtree_summary(db, scope_id)
+    risks = aggregates.recent_risks(db, scope_id, limit=1)
+    incidents = aggregates.recent_incidents(db, scope_id, limit=1)
+    actions = aggregates.recent_actions(db, scope_id, limit=1)
+    node_name = node.name if node_id else "All Nodes"
     prompt = f"Provide a concise AI insight for the following scope: {node_name}\n"
-    prompt += f"Risks: {len(risks)}\n"
-    prompt += f"Incidents: {len(incidents)}\n"
-    prompt += f"Actions: {len(actions)}\n"
+    prompt += f"Risks: {summary['risks_count']}\n"
+    prompt += f"Incidents: {summary['incidents_count']}\n"
+    prompt += f"Actions: {summary['actions_count']}\n"
     if risks:
         prompt += f"Top Risk: {risks[0].title} - {risks[0].description}\n"
     if incidents:
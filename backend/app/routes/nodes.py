@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from .. import schemas, crud, models
+from .. import schemas, crud, models, conditional, versions
 from ..database import get_db
-from typing import List
+from typing import Optional
 
 router = APIRouter(prefix="/nodes", tags=["nodes"])
 
@@ -17,6 +17,25 @@ def get_node(node_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Node not found")
     return db_node
 
-@router.get("/", response_model=List[schemas.Node])
-def get_nodes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_nodes(db, skip=skip, limit=limit)
+@router.put("/{node_id}/parent", response_model=schemas.Node)
+def move_node(node_id: int, move: schemas.NodeMove, db: Session = Depends(get_db)):
+    db_node = crud.get_node(db, node_id=node_id)
+    if db_node is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    try:
+        return crud.move_node(db, db_node, parent_id=move.parent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=schemas.Page[schemas.Node])
+def get_nodes(request: Request, response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    # Unchanged nodes table: 304 before any rows are loaded
+    validators = conditional.compute_validators(db, [versions.HIERARCHY], conditional.request_scope(request))
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    conditional.apply(response, validators)
+    try:
+        items, next_cursor = crud.get_nodes(db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from .. import schemas, crud, models
+from .. import schemas, crud, models, conditional, versions
 from ..database import get_db
-from typing import List
+from typing import List, Literal, Optional
 
 router = APIRouter(prefix="/risks", tags=["risks"])
 
@@ -10,6 +10,10 @@ router = APIRouter(prefix="/risks", tags=["risks"])
 def create_risk(risk: schemas.RiskCreate, db: Session = Depends(get_db)):
     return crud.create_risk(db=db, risk=risk)
 
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_risks(risks: List[schemas.RiskCreate] = Body(..., max_length=crud.BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    return crud.bulk_create_risks(db, risks)
+
 @router.get("/{risk_id}", response_model=schemas.Risk)
 def get_risk(risk_id: int, db: Session = Depends(get_db)):
     db_risk = crud.get_risk(db, risk_id=risk_id)
@@ -17,6 +21,15 @@ def get_risk(risk_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Risk not found")
     return db_risk
 
-@router.get("/", response_model=List[schemas.Risk])
-def get_risks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_risks(db, skip=skip, limit=limit)
+@router.get("/", response_model=schemas.Page[schemas.Risk])
+def get_risks(request: Request, response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000), order_by: Literal["id", "created_at"] = "id", db: Session = Depends(get_db)):
+    # Unchanged risks table: 304 before any rows are loaded
+    validators = conditional.compute_validators(db, [versions.RISKS], conditional.request_scope(request))
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    conditional.apply(response, validators)
+    try:
+        items, next_cursor = crud.get_risks(db, cursor=cursor, limit=limit, order_by=order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
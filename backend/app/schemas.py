@@ -1,7 +1,29 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, field_validator
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Generic, List, Optional, TypeVar
 import datetime
 
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+    elapsed_seconds: float
+    rows_per_second: Optional[float] = None
+
 
 class NodeBase(BaseModel):
     name: str
@@ -13,6 +35,10 @@ class NodeCreate(NodeBase):
     pass
 
 
+class NodeMove(BaseModel):
+    parent_id: Optional[int] = None
+
+
 class Node(NodeBase):
     id: int
 
@@ -88,7 +114,16 @@ class IncidentBase(BaseModel):
 
 
 class IncidentCreate(IncidentBase):
-    pass
+    loss_amount: Optional[int] = None
+
+    @field_validator("loss_amount", mode="before")
+    @classmethod
+    def round_loss_amount(cls, value):
+        # incidents.loss_amount is an integer column; round here (half away
+        # from zero, like PostgreSQL) so the rollup delta and the stored row agree
+        if isinstance(value, float):
+            return int(Decimal(str(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        return value
 
 
 class Incident(IncidentBase):
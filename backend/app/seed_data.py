@@ -1,7 +1,7 @@
 import random
 import re
 from .database import Base, engine, get_db
-from . import models, schemas, crud, ai
+from . import models, schemas, crud, ai, versions
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
@@ -58,7 +58,11 @@ def seed():
     db.query(models.ActionItem).delete()
     db.query(models.Risk).delete()
     db.query(models.User).delete()
+    db.query(models.NodeRollupBreakdown).delete()
+    db.query(models.NodeRollup).delete()
+    db.query(models.NodeClosure).delete()
     db.query(models.Node).delete()
+    versions.bump_all(db)
     db.commit()
     # Reset sequences (PostgreSQL only)
     for table in ["action_items", "risks", "users", "nodes"]:
@@ -0,0 +1,100 @@
+"""
+Table summarization for the Hugging Face transformers provider.
+
+Tables are rendered one row per line, packed into chunks that fit the
+summarization model's token limit and summarized together in one batched
+pipeline call. Tables that needed several chunks are then reduced: their
+partial summaries are joined, re-chunked and summarized again (batched
+across tables) until each table has a single summary.
+"""
+import os
+from typing import Callable, Dict, List
+from . import ai
+
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "900"))
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_MAX_ROUNDS = 5
+
+
+def table_rows(table) -> List[str]:
+    """One ``column: value; ...`` line per row of a DataFrame or dict of columns."""
+    if hasattr(table, "to_dict"):
+        records = table.to_dict(orient="records")
+    else:
+        columns = list(table)
+        records = [dict(zip(columns, values)) for values in zip(*table.values())]
+    lines = []
+    for record in records:
+        # Skip empty cells (None and NaN)
+        cells = [f"{k}: {v}" for k, v in record.items() if v is not None and v == v]
+        lines.append("; ".join(cells))
+    return lines
+
+
+def chunk_lines(lines: List[str], count_tokens: Callable[[str], int], max_tokens: int) -> List[str]:
+    """Greedily pack ``lines`` into chunks of at most ``max_tokens`` tokens.
+
+    A single line longer than the budget becomes its own chunk and is
+    truncated by the pipeline.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for line in lines:
+        tokens = count_tokens(line) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def summarize_tables(tables: Dict[str, object]) -> Dict[str, str]:
+    """Summarize each named table completely, using one batched call per map/reduce round."""
+    entry = ai.get_pipeline("summarization")
+    if entry is None:
+        return {name: "Transformers not installed." for name in tables}
+    summarizer = entry.value
+    tokenizer = summarizer.tokenizer
+
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    results, keys, pending = {}, {}, {}
+    for name, table in tables.items():
+        if ai.insight_cache is not None:
+            keys[name] = ai.insight_cache_key(f"summarize {name}", table, "summarization")
+            cached = ai.insight_cache.get(keys[name])
+            if cached is not None:
+                results[name] = cached
+                continue
+        chunks = chunk_lines(table_rows(table), count_tokens, SUMMARY_CHUNK_TOKENS)
+        if chunks:
+            pending[name] = chunks
+        else:
+            results[name] = ""
+
+    rounds = 0
+    while pending:
+        rounds += 1
+        batch = [(name, chunk) for name, chunks in pending.items() for chunk in chunks]
+        with entry.lock:
+            outputs = summarizer(
+                [chunk for _, chunk in batch],
+                batch_size=SUMMARY_BATCH_SIZE,
+                truncation=True
+            )
+        partials = {}
+        for (name, _), output in zip(batch, outputs):
+            partials.setdefault(name, []).append(output["summary_text"])
+        pending = {}
+        for name, summaries in partials.items():
+            if len(summaries) == 1 or rounds >= SUMMARY_MAX_ROUNDS:
+                results[name] = " ".join(summaries)
+                if name in keys:
+                    ai.insight_cache.set(keys[name], results[name])
+            else:
+                # Reduce: summarize the concatenated partial summaries
+                pending[name] = chunk_lines(summaries, count_tokens, SUMMARY_CHUNK_TOKENS)
+    return results
@@ -0,0 +1,54 @@
+"""
+Data version counters.
+
+Each named counter (one per table) is bumped in the same transaction as the
+write it describes, so any worker can tell whether something derived from
+that data is still current with one primary-key lookup. The counters also
+drive the HTTP validators in ``conditional``.
+"""
+import datetime
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from . import models
+
+HIERARCHY = "nodes"
+USERS = "users"
+RISKS = "risks"
+INCIDENTS = "incidents"
+ACTION_ITEMS = "action_items"
+ALL = (HIERARCHY, USERS, RISKS, INCIDENTS, ACTION_ITEMS)
+
+
+def get_version(db: Session, name: str) -> int:
+    version = db.execute(
+        select(models.DataVersion.version).where(models.DataVersion.name == name)
+    ).scalar()
+    return version or 0
+
+
+def get_versions(db: Session, names: Iterable[str]) -> Dict[str, Tuple[int, datetime.datetime]]:
+    """``{name: (version, updated_at)}`` for the counters that exist, in one query."""
+    rows = db.execute(
+        select(models.DataVersion.name, models.DataVersion.version, models.DataVersion.updated_at)
+        .where(models.DataVersion.name.in_(list(names)))
+    ).all()
+    return {row.name: (row.version, row.updated_at) for row in rows}
+
+
+def bump_version(db: Session, name: str):
+    """Increment ``name``; the caller owns the transaction."""
+    now = datetime.datetime.utcnow()
+    stmt = pg_insert(models.DataVersion).values(name=name, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.DataVersion.name],
+        set_={"version": models.DataVersion.version + 1, "updated_at": now}
+    )
+    db.execute(stmt)
+
+
+def bump_all(db: Session):
+    """Bump every table counter (bulk loads and resets); the caller owns the transaction."""
+    for name in ALL:
+        bump_version(db, name)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Compare two ``benchmarks/run.py`` reports.
+
+Prints, per scenario, the base and head values of p50/p95/p99 latency and
+throughput with their relative change, plus each server's peak RSS. Exits
+non-zero when a scenario's p95 latency grew, its throughput fell or a
+server's peak RSS grew by more than ``--threshold`` percent:
+
+    python benchmarks/compare.py before.json after.json --threshold 10
+
+Reports for different datasets or load settings are flagged, since their
+numbers are not comparable.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_METRICS = ["p50_ms", "p95_ms", "p99_ms"]
+# metric -> +1 when higher is worse, -1 when lower is worse
+GATED = {"p95_ms": 1, "throughput_rps": -1}
+
+
+def change_pct(base, head):
+    if base in (None, 0) or head is None:
+        return None
+    return round((head - base) / base * 100, 1)
+
+
+def compare(base: dict, head: dict, threshold: float) -> dict:
+    scenarios, regressions = {}, []
+    for name in sorted(set(base["scenarios"]) | set(head["scenarios"])):
+        before, after = base["scenarios"].get(name), head["scenarios"].get(name)
+        if before is None or after is None:
+            scenarios[name] = {"missing_in": "base" if before is None else "head"}
+            continue
+        metrics = {}
+        for metric in LATENCY_METRICS + ["throughput_rps", "failures"]:
+            change = change_pct(before.get(metric), after.get(metric))
+            metrics[metric] = {"base": before.get(metric), "head": after.get(metric), "change_pct": change}
+            worse = GATED.get(metric)
+            if worse and change is not None and change * worse > threshold:
+                regressions.append(f"{name}: {metric} {before[metric]} -> {after[metric]} ({change:+}%)")
+        if after.get("failures") and not before.get("failures"):
+            regressions.append(f"{name}: {after['failures']} failed requests")
+        scenarios[name] = metrics
+
+    peak_rss = {}
+    for app in sorted(set(base.get("peak_rss_mb", {})) | set(head.get("peak_rss_mb", {}))):
+        before, after = base.get("peak_rss_mb", {}).get(app), head.get("peak_rss_mb", {}).get(app)
+        change = change_pct(before, after)
+        peak_rss[app] = {"base": before, "head": after, "change_pct": change}
+        if change is not None and change > threshold:
+            regressions.append(f"{app}: peak RSS {before}MB -> {after}MB ({change:+}%)")
+
+    comparable = all(
+        {k: v for k, v in base.get(key, {}).items() if k not in ("loaded", "load_seconds", "rollup_seconds")}
+        == {k: v for k, v in head.get(key, {}).items() if k not in ("loaded", "load_seconds", "rollup_seconds")}
+        for key in ("dataset", "settings")
+    )
+    return {
+        "base": {"commit": base.get("commit"), "dirty": base.get("dirty"), "created_at": base.get("created_at")},
+        "head": {"commit": head.get("commit"), "dirty": head.get("dirty"), "created_at": head.get("created_at")},
+        "comparable": comparable,
+        "threshold_pct": threshold,
+        "scenarios": scenarios,
+        "peak_rss_mb": peak_rss,
+        "regressions": regressions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="report of the baseline commit")
+    parser.add_argument("head", help="report of the commit under test")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    parser.add_argument("--output", help="write the JSON comparison to this file")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    result = compare(base, head, args.threshold)
+    report = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+    if not result["comparable"]:
+        print("warning: the reports used different datasets or load settings", file=sys.stderr)
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
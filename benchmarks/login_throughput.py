@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Login throughput under concurrent load.
+
+Fires ``--requests`` logins at a running server with ``--concurrency``
+clients in flight, while a probe keeps requesting a cheap page. Reports
+logins per second, login latency percentiles and the probe's latency: if
+bcrypt ran on the event loop, the probe would queue behind every login.
+
+    uvicorn main:app --port 8000 &
+    python benchmarks/login_throughput.py --url http://localhost:8000 --concurrency 32
+    python benchmarks/login_throughput.py --endpoint token --url http://localhost:8001
+
+Requires ``httpx``. Uses the seeded password by default.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+ENDPOINTS = {
+    # path, expected status, probe path
+    "login": ("/login", 302, "/login"),
+    "token": ("/token", 200, "/"),
+}
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(samples) * 1000, 1) if samples else 0.0,
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    path, expected, probe_path = ENDPOINTS[args.endpoint]
+    latencies, failures = [], 0
+    probe_latencies = []
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(args.usernames[i % len(args.usernames)])
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, follow_redirects=False) as client:
+        async def worker():
+            nonlocal failures
+            while not queue.empty():
+                username = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.post(path, data={"username": username, "password": args.password})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != expected:
+                    failures += 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get(probe_path)
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(args.probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "endpoint": path,
+        "concurrency": args.concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "logins_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "failures": failures,
+        "login": summarize(latencies),
+        "probe": summarize(probe_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="login")
+    parser.add_argument("--username", dest="usernames", action="append", help="repeat to rotate users")
+    parser.add_argument("--password", default="P@ssw0rd")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+    if not args.usernames:
+        parser.error("pass at least one --username (any seeded user)")
+
+    result = asyncio.run(run(args))
+    report = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+    sys.exit(1 if result["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
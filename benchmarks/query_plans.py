@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Query plan regression harness.
+
+Runs the data loaders behind the dashboard, insights and list routes against
+the configured database (load one first with ``python seed.py --scale N``),
+captures every SELECT they issue and runs ``EXPLAIN (FORMAT JSON)`` on it.
+Exits non-zero when a plan sequentially scans a table with at least
+``--min-rows`` rows:
+
+    python benchmarks/query_plans.py --level 4 --min-rows 10000
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WATCHED_TABLES = ["nodes", "node_closure", "users", "risks", "incidents", "action_items"]
+
+
+def _scenarios(main, crud, db, node_id: int, user_id: int):
+    """(label, callable) pairs; each callable runs one route's queries."""
+    def list_pages(getter, **kwargs):
+        def run():
+            items, cursor = getter(db, limit=50, **kwargs)
+            if cursor:
+                getter(db, cursor=cursor, limit=50, **kwargs)
+        return run
+
+    return [
+        ("dashboard", lambda: main._dashboard_data(db, node_id)),
+        ("insights", lambda: main._insight_context(db, node_id)),
+        ("risks page", lambda: main._risks_page_data(db, node_id, {}, include_header=True)),
+        ("risks page (filtered)", lambda: main._risks_page_data(db, node_id, {"status": "open", "date_from": "2024-06-01"}, include_header=True)),
+        ("incidents page", lambda: main._incidents_page_data(db, node_id, {}, include_header=True)),
+        ("incidents page (financial)", lambda: main._incidents_page_data(db, node_id, {"kind": "financial"}, include_header=True)),
+        ("GET /nodes/", list_pages(crud.get_nodes)),
+        ("GET /users/", list_pages(crud.get_users)),
+        ("GET /risks/", list_pages(crud.get_risks)),
+        ("GET /risks/?order_by=created_at", list_pages(crud.get_risks, order_by="created_at")),
+        ("GET /incidents/", list_pages(crud.get_incidents)),
+        ("GET /incidents/?order_by=created_at", list_pages(crud.get_incidents, order_by="created_at")),
+        ("GET /action_items/?assigned_to=", list_pages(crud.get_action_items, assigned_to=user_id)),
+    ]
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--node-id", type=int, help="scope node (default: first node at --level)")
+    parser.add_argument("--level", type=int, default=4, help="hierarchy level of the default scope node")
+    parser.add_argument("--min-rows", type=int, default=10000, help="seq scans of smaller tables are allowed")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event, func, text
+    import main as htmx_main
+    from backend.app import crud, models
+    from backend.app.database import SessionLocal, engine
+
+    with engine.begin() as conn:
+        for table in WATCHED_TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+        table_rows = dict(conn.execute(
+            text("SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(:names)"),
+            {"names": WATCHED_TABLES}
+        ).all())
+
+    db = SessionLocal()
+    captured = []
+    label = [None]
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if label[0] and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((label[0], statement, parameters))
+
+    try:
+        node_id = args.node_id or db.query(func.min(models.Node.id)).filter(models.Node.level == args.level).scalar()
+        if node_id is None:
+            parser.error(f"no node at level {args.level}; load data first or pass --node-id")
+        user_id = db.query(func.min(models.User.id)).scalar()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            for name, run in _scenarios(htmx_main, crud, db, node_id, user_id):
+                label[0] = name
+                run()
+        finally:
+            label[0] = None
+            event.remove(engine, "before_cursor_execute", capture)
+    finally:
+        db.close()
+
+    results, failures = [], []
+    with engine.connect() as conn:
+        for name, statement, parameters in captured:
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            root = plan[0]["Plan"]
+            scans = [
+                {"node": n["Node Type"], "relation": n.get("Relation Name"), "index": n.get("Index Name")}
+                for n in _plan_nodes(root) if "Relation Name" in n
+            ]
+            seq_scans = [
+                s["relation"] for s in scans
+                if s["node"] == "Seq Scan" and table_rows.get(s["relation"], 0) >= args.min_rows
+            ]
+            results.append({
+                "route": name,
+                "statement": " ".join(statement.split())[:300],
+                "total_cost": root.get("Total Cost"),
+                "scans": scans,
+            })
+            for relation in seq_scans:
+                failures.append(f"{name}: Seq Scan on {relation} ({table_rows[relation]} rows)")
+
+    report = json.dumps({
+        "node_id": node_id,
+        "table_rows": table_rows,
+        "results": results,
+        "failures": failures,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
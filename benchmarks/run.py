@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark over a generated org hierarchy.
+
+Loads a dataset with ``backend.app.datagen`` (this resets the database),
+starts both apps under uvicorn, logs in as a benchmark user scoped to the
+root node and drives each scenario with ``--concurrency`` clients for
+``--requests`` requests after a warm-up. The JSON report has p50/p95/p99
+latency, throughput and failures per scenario, each server's peak RSS, the
+dataset's row counts and the git commit, so two runs can be diffed with
+``benchmarks/compare.py``:
+
+    python benchmarks/run.py --profile small --output before.json
+    git checkout my-branch
+    python benchmarks/run.py --profile small --skip-load --output after.json
+    python benchmarks/compare.py before.json after.json
+
+Profiles go from the datagen default (about 1.4k nodes) to ``large``
+(about 111k nodes and 3M incidents); ``--depth``, ``--fanout`` and
+``--rows-per-unit`` override them. The insights scenario includes the AI
+provider call unless the answer is cached, so run with an unconfigured
+``AI_PROVIDER`` to measure the app alone.
+
+Requires ``httpx``, ``uvicorn`` and a local PostgreSQL (settings from
+``.env``). Peak RSS is read from /proc, so it is only reported on Linux.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from login_throughput import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_USERNAME = "bench_root"
+BENCH_PASSWORD = "P@ssw0rd"
+COUNTED_TABLES = ["nodes", "users", "risks", "action_items", "incidents"]
+
+# Nodes = sum(fanout ** level for level in range(depth)); rows scale with the business units
+PROFILES = {
+    "seed": {"depth": 6, "fanout": 4.0, "rows_per_unit": 1.0},     # ~1.4k nodes, like seed_data
+    "small": {"depth": 6, "fanout": 6.0, "rows_per_unit": 1.0},    # ~9k nodes
+    "medium": {"depth": 6, "fanout": 8.0, "rows_per_unit": 3.0},   # ~37k nodes, ~300k incidents
+    "large": {"depth": 6, "fanout": 10.0, "rows_per_unit": 10.0},  # ~111k nodes, ~3M incidents
+}
+
+# name -> (app, method, path); {node_id} is the benchmark user's node
+SCENARIOS = {
+    "dashboard": ("htmx", "GET", "/dashboard"),
+    "node_tree": ("htmx", "GET", "/node-tree"),
+    "insights": ("htmx", "GET", "/insights/{node_id}"),
+    "risks_page": ("htmx", "GET", "/risks"),
+    "incidents_page": ("htmx", "GET", "/incidents"),
+    "api_nodes": ("api", "GET", "/nodes/?limit=100"),
+    "api_risks": ("api", "GET", "/risks/?limit=100"),
+    "api_incidents": ("api", "GET", "/incidents/?limit=100"),
+    "api_action_items": ("api", "GET", "/action_items/?limit=100"),
+    "token": ("api", "POST", "/token"),
+}
+
+APPS = {
+    # uvicorn target, readiness path
+    "htmx": ("main:app", "/login"),
+    "api": ("backend.app.main:app", "/"),
+}
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_dataset(args) -> dict:
+    from backend.app.datagen import generate
+
+    return generate(seed=args.seed, depth=args.depth, fanout=args.fanout, rows_per_unit=args.rows_per_unit)
+
+
+def prepare_user() -> int:
+    """Create the benchmark user on the root node (if missing); returns the node id."""
+    from backend.app import crud, models, schemas
+    from backend.app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        root = db.query(models.Node).filter(models.Node.parent_id.is_(None)).order_by(models.Node.id).first()
+        if root is None:
+            raise SystemExit("The database has no nodes; run without --skip-load first")
+        user = db.query(models.User).filter(models.User.username == BENCH_USERNAME).first()
+        if user is None:
+            crud.create_user(db, schemas.UserCreate(
+                username=BENCH_USERNAME, email=f"{BENCH_USERNAME}@example.com", password=BENCH_PASSWORD,
+                node_id=root.id, level=root.level
+            ))
+        elif user.node_id != root.id:
+            raise SystemExit(f"{BENCH_USERNAME} exists but is not on the root node")
+        return root.id
+    finally:
+        db.close()
+
+
+def row_counts() -> dict:
+    from sqlalchemy import text
+    from backend.app.database import engine
+
+    with engine.connect() as conn:
+        return {table: conn.execute(text(f"SELECT count(*) FROM {table}")).scalar() for table in COUNTED_TABLES}
+
+
+class Server:
+    """One app under uvicorn in a child process."""
+
+    def __init__(self, name: str, port: int):
+        self.name = name
+        self.target, self.ready_path = APPS[name]
+        self.url = f"http://127.0.0.1:{port}"
+        self.port = port
+        self.process = None
+
+    def start(self, timeout: float):
+        import httpx
+
+        # Query budget listeners would add work to every statement
+        env = {**os.environ, "QUERY_BUDGET_MODE": "off"}
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.target, "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=ROOT, env=env
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit(f"{self.target} exited with {self.process.returncode}")
+            try:
+                httpx.get(self.url + self.ready_path, timeout=1)
+                return
+            except httpx.TransportError:
+                time.sleep(0.2)
+        self.stop()
+        raise SystemExit(f"{self.target} did not start within {timeout}s")
+
+    def peak_rss_mb(self):
+        # VmHWM is the high-water mark of resident memory since start
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 1024
+        except (OSError, StopIteration):
+            return None
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+async def drive(client, method: str, path: str, requests: int, concurrency: int, warmup: int, data=None) -> dict:
+    for _ in range(warmup):
+        await client.request(method, path, data=data)
+    latencies, failures = [], 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal failures
+        for _ in pending:
+            started = time.perf_counter()
+            response = await client.request(method, path, data=data)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        **summarize(latencies),
+        "failures": failures,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+async def run_scenarios(args, servers: dict, node_id: int) -> dict:
+    import httpx
+
+    credentials = {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=servers["htmx"].url, timeout=120, limits=limits) as htmx, \
+            httpx.AsyncClient(base_url=servers["api"].url, timeout=120, limits=limits) as api:
+        # The login response sets the access_token cookie on the client
+        login = await htmx.post("/login", data=credentials)
+        token = await api.post("/token", data=credentials)
+        if login.status_code != 302 or token.status_code != 200:
+            raise SystemExit(f"Login failed: /login {login.status_code}, /token {token.status_code}")
+        api.headers["Authorization"] = f"Bearer {token.json()['access_token']}"
+        clients = {"htmx": htmx, "api": api}
+
+        for name in args.scenarios:
+            app, method, path = SCENARIOS[name]
+            path = path.format(node_id=node_id)
+            data = credentials if name == "token" else None
+            print(f"{name}: {method} {path}", file=sys.stderr)
+            results[name] = {
+                "app": app, "method": method, "path": path,
+                **await drive(clients[app], method, path, args.requests, args.concurrency, args.warmup, data),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="seed")
+    parser.add_argument("--depth", type=int, help="hierarchy levels including Root (overrides the profile)")
+    parser.add_argument("--fanout", type=float, help="children per node (overrides the profile)")
+    parser.add_argument("--rows-per-unit", type=float, help="row multiplier per business unit (overrides the profile)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-load", action="store_true", help="benchmark the current database as is")
+    parser.add_argument("--scenario", dest="scenarios", action="append", choices=list(SCENARIOS),
+                        help="repeat to select scenarios (default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    parser.add_argument("--port", type=int, default=8100, help="HTMX app port; the API uses the next one")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+    profile = PROFILES[args.profile]
+    for key in ("depth", "fanout", "rows_per_unit"):
+        if getattr(args, key) is None:
+            setattr(args, key, profile[key])
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    dataset = {"profile": args.profile, "depth": args.depth, "fanout": args.fanout,
+               "rows_per_unit": args.rows_per_unit, "seed": args.seed, "loaded": not args.skip_load}
+    if not args.skip_load:
+        print(f"Loading dataset (depth {args.depth}, fanout {args.fanout})...", file=sys.stderr)
+        generated = load_dataset(args)
+        dataset.update(load_seconds=generated["load_seconds"], rollup_seconds=generated["rollup_seconds"])
+    node_id = prepare_user()
+    dataset["rows"] = row_counts()
+
+    servers = {"htmx": Server("htmx", args.port), "api": Server("api", args.port + 1)}
+    try:
+        for server in servers.values():
+            server.start(args.startup_timeout)
+        scenarios = asyncio.run(run_scenarios(args, servers, node_id))
+        peak_rss = {name: server.peak_rss_mb() for name, server in servers.items()}
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    result = {
+        "commit": _git("rev-parse", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "ai_provider": os.getenv("AI_PROVIDER", "openai"),
+        "dataset": dataset,
+        "settings": {"requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup},
+        "scenarios": scenarios,
+        "peak_rss_mb": {name: round(value, 1) if value is not None else None for name, value in peak_rss.items()},
+    }
+    report = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+    sys.exit(1 if any(s["failures"] for s in scenarios.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Startup budget for the ASGI apps.
+
+Imports each app in a fresh interpreter and records wall-clock import time,
+resident memory and which heavy modules got loaded. Exits non-zero when a
+budget is exceeded, so it can gate CI and autoscaling changes:
+
+    python benchmarks/startup.py --budget-seconds 3 --budget-rss-mb 250
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ["main:app", "backend.app.main:app"]
+HEAVY_MODULES = ["torch", "transformers", "pandas", "openai", "google.generativeai"]
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = """
+import importlib, json, os, sys, time
+started = time.perf_counter()
+module_name, attr = sys.argv[1].split(":")
+app = getattr(importlib.import_module(module_name), attr)
+elapsed = time.perf_counter() - started
+try:
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = json.loads(sys.argv[2])
+print(json.dumps({
+    "import_seconds": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "heavy_modules": [m for m in heavy if m in sys.modules],
+}))
+"""
+
+
+def measure(target: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, target, json.dumps(HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "target": target,
+        "ai_provider": os.getenv("AI_PROVIDER", "openai"),
+        "runs": runs,
+        "import_seconds_median": statistics.median(s["import_seconds"] for s in samples),
+        "import_seconds_max": max(s["import_seconds"] for s in samples),
+        "rss_mb_median": statistics.median(s["rss_mb"] for s in samples),
+        "heavy_modules": samples[-1]["heavy_modules"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", help="module:attr to import (default: both apps)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-seconds", type=float, help="fail if the median import time exceeds this")
+    parser.add_argument("--budget-rss-mb", type=float, help="fail if the median RSS after import exceeds this")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = [measure(target, args.runs) for target in (args.target or TARGETS)]
+    failures = []
+    for result in results:
+        if args.budget_seconds is not None and result["import_seconds_median"] > args.budget_seconds:
+            failures.append(f"{result['target']}: import {result['import_seconds_median']:.2f}s > {args.budget_seconds}s")
+        if args.budget_rss_mb is not None and result["rss_mb_median"] > args.budget_rss_mb:
+            failures.append(f"{result['target']}: RSS {result['rss_mb_median']:.0f}MB > {args.budget_rss_mb}MB")
+
+    report = json.dumps({"results": results, "failures": failures}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
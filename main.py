@@ -1,41 +1,43 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Form
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Form, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from jose import jwt
 from sqlalchemy.orm import Session
-from backend.app.database import engine, Base, get_db
-from backend.app import crud, models, schemas, ai
+from backend.app.database import engine, Base, SessionLocal, DBRunner, get_db_runner
+from backend.app import crud, schemas, ai, aggregates, rollups, org_tree, auth, conditional, versions, metrics, query_budget
+from backend.app.assets import StaticAssets
+from backend.app.compression import CompressionMiddleware
 import os
-from datetime import datetime, timedelta
+import asyncio
+import html
+from urllib.parse import urlencode
+from datetime import date, datetime, timedelta
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="Risk Insights - HTMX")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Mount static files (fingerprinted and precompressed, cached as immutable)
+static_assets = StaticAssets(directory="static", url_prefix="/static")
+app.mount("/static", static_assets, name="static")
+
+# Compress large dynamic responses (streams pass through)
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so request timings include compression
+app.add_middleware(metrics.MetricsMiddleware, app_name="htmx")
 
 # Templates
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_assets.url
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
-        return None
-    return user
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
@@ -43,34 +45,38 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)):
+async def get_current_user_from_cookie(request: Request, db: DBRunner = Depends(get_db_runner)) -> Optional[auth.Principal]:
     token = request.cookies.get("access_token")
     if not token:
         return None
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-    except JWTError:
+    username = auth.token_subject(token)
+    if username is None:
         return None
-    user = db.query(models.User).filter(models.User.username == username).first()
-    return user
+    # Principals are cached per token subject and hold only the user's node_id
+    # (see auth.py); a miss runs on the page's own DBRunner, and routes that
+    # stream call db.release() first
+    return await auth.load_principal_async(db, username)
 
-def require_auth(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user_from_cookie(request, db)
+async def require_auth(request: Request, db: DBRunner = Depends(get_db_runner)):
+    user = await get_current_user_from_cookie(request, db)
     if not user:
         raise HTTPException(status_code=302, headers={"Location": "/login"})
     return user
 
-# Helper to recursively collect all descendant node IDs
-def get_descendant_node_ids(node, collected=None):
-    if collected is None:
-        collected = set()
-    collected.add(node.id)
-    for child in node.children:
-        get_descendant_node_ids(child, collected)
-    return collected
+async def _unless_disconnected(request: Request, coro, poll_interval: float = 0.5):
+    """Await ``coro``, cancelling it (and returning None) if the client disconnects."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                return None
+    finally:
+        if not task.done():
+            task.cancel()
 
 # Routes
 @app.get("/", response_class=HTMLResponse)
@@ -82,15 +88,16 @@ async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.post("/login")
-async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    user = authenticate_user(db, username, password)
-    if not user:
+async def login(request: Request, username: str = Form(...), password: str = Form(...), db: DBRunner = Depends(get_db_runner)):
+    # bcrypt runs on auth's bounded pool, not on the event loop
+    username = await auth.authenticate_user(db, username, password)
+    if not username:
         return templates.TemplateResponse("login.html", {
             "request": request, 
             "error": "Invalid username or password"
         })
     
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(data={"sub": username})
     response = RedirectResponse(url="/dashboard", status_code=302)
     response.set_cookie(key="access_token", value=access_token, httponly=True)
     return response
@@ -101,139 +108,327 @@ async def logout():
     response.delete_cookie(key="access_token")
     return response
 
-@app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, user: models.User = Depends(require_auth), db: Session = Depends(get_db)):
-    # Get user's node and all descendant nodes
-    user_node = db.query(models.Node).filter(models.Node.id == user.node_id).first()
+# Query budgets (@query_budget.budget) count a cold principal cache (one
+# query) and the ETag check; enforced only with QUERY_BUDGET_MODE set.
+
+# Page data loaders. Each takes a sync Session and runs through DBRunner, so
+# the queries never block the event loop (on asyncpg with USE_ASYNC_DB=true,
+# otherwise on a worker thread).
+
+def _dashboard_data(db: Session, node_id: int) -> dict:
+    # Get user's node; counts and top rows for its subtree come from SQL
+    user_node = crud.get_node(db, node_id) if node_id else None
     if user_node:
-        node_ids = get_descendant_node_ids(user_node)
+        summary = aggregates.subtree_summary(db, user_node.id)
+        risks = aggregates.recent_risks(db, user_node.id, limit=5)
+        incidents = aggregates.recent_incidents(db, user_node.id, limit=5)
     else:
-        node_ids = []
+        summary = {"risks_count": 0, "incidents_count": 0, "actions_count": 0, "financial_loss": 0}
+        risks, incidents = [], []
+    return {
+        "user_node": user_node,
+        "risks_count": summary["risks_count"],
+        "incidents_count": summary["incidents_count"],
+        "actions_count": summary["actions_count"],
+        "financial_loss": summary["financial_loss"],
+        "risks": risks,
+        "incidents": incidents
+    }
+
+def _insight_context(db: Session, node_id: int) -> Optional[dict]:
+    """Counts, top rows and the AI prompt for a node's subtree (None if the node is missing)."""
+    node = crud.get_node(db, node_id)
+    if not node:
+        return None
+    
+    # Aggregate data for the node's subtree in SQL
+    summary = aggregates.subtree_summary(db, node.id)
+    risks = aggregates.recent_risks(db, node.id, limit=3)
+    incidents = aggregates.recent_incidents(db, node.id, limit=3)
+    actions = aggregates.recent_actions(db, node.id, limit=1)
     
-    # Get aggregated data
-    risks = db.query(models.Risk).filter(models.Risk.node_id.in_(node_ids)).all() if node_ids else []
-    incidents = db.query(models.Incident).filter(models.Incident.node_id.in_(node_ids)).all() if node_ids else []
-    actions = db.query(models.ActionItem).join(models.Risk).filter(models.Risk.node_id.in_(node_ids)).all() if node_ids else []
+    prompt = f"Provide a concise AI insight for the following scope: {node.name}\n"
+    prompt += f"Risks: {summary['risks_count']}\n"
+    prompt += f"Incidents: {summary['incidents_count']}\n"
+    prompt += f"Actions: {summary['actions_count']}\n"
+    if risks:
+        prompt += f"Top Risk: {risks[0].title} - {risks[0].description}\n"
+    if incidents:
+        prompt += f"Recent Incident: {incidents[0].name} - {incidents[0].description}\n"
+    if actions:
+        prompt += f"Sample Action: {actions[0].description}\n"
+    prompt += "Summarize the risk and incident landscape and suggest a next step."
     
-    # Calculate financial loss
-    financial_loss = sum(i.loss_amount for i in incidents if i.is_financial and i.loss_amount)
+    return {
+        "node": node,
+        "risks_count": summary["risks_count"],
+        "incidents_count": summary["incidents_count"],
+        "actions_count": summary["actions_count"],
+        "risks": risks,
+        "incidents": incidents,
+        "prompt": prompt
+    }
+
+PAGE_SIZE = 25
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    # Empty or malformed filter inputs are ignored rather than rejected
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def _rows_url(path: str, filters: dict, cursor: str) -> str:
+    return f"{path}?{urlencode({**{k: v for k, v in filters.items() if v}, 'cursor': cursor})}"
+
+def _risks_page_data(db: Session, node_id: int, filters: dict, cursor: Optional[str] = None,
+                     include_header: bool = False) -> dict:
+    if not node_id:
+        return {"risks": [], "next_url": None, "breakdown": {"status": [], "type": []}, "total": 0}
+    risks, next_cursor = crud.get_scoped_risks(
+        db, node_id, cursor=cursor, limit=PAGE_SIZE,
+        status=filters.get("status"), risk_type=filters.get("risk_type"),
+        created_from=_parse_date(filters.get("date_from")), created_to=_parse_date(filters.get("date_to"))
+    )
+    data = {"risks": risks, "next_url": next_cursor and _rows_url("/risks/rows", filters, next_cursor)}
+    if include_header:
+        # Filter options and the total only render with the full page, not the row partials
+        data["breakdown"] = aggregates.risk_breakdown(db, node_id)
+        data["total"] = aggregates.subtree_summary(db, node_id)["risks_count"]
+    return data
+
+def _incidents_page_data(db: Session, node_id: int, filters: dict, cursor: Optional[str] = None,
+                         include_header: bool = False) -> dict:
+    if not node_id:
+        return {"incidents": [], "next_url": None, "total": 0}
+    financial = {"financial": True, "non_financial": False}.get(filters.get("kind"))
+    incidents, next_cursor = crud.get_scoped_incidents(
+        db, node_id, cursor=cursor, limit=PAGE_SIZE, is_financial=financial,
+        created_from=_parse_date(filters.get("date_from")), created_to=_parse_date(filters.get("date_to"))
+    )
+    data = {"incidents": incidents, "next_url": next_cursor and _rows_url("/incidents/rows", filters, next_cursor)}
+    if include_header:
+        data["total"] = aggregates.subtree_summary(db, node_id)["incidents_count"]
+    return data
+
+def _sse_event(event: str, data: str) -> str:
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+# Tables each kind of page reads; their versions make up the page's ETag
+TREE_TABLES = [versions.HIERARCHY]
+SCOPE_TABLES = [versions.HIERARCHY, versions.RISKS, versions.INCIDENTS, versions.ACTION_ITEMS]
+
+async def _validators(request: Request, db: DBRunner, user: auth.Principal, tables, *extra) -> conditional.Validators:
+    # The nav shows the username and pages are scoped to the user's node
+    scope = conditional.request_scope(request, user.username, user.node_id, *extra)
+    return await db.run(conditional.compute_validators, tables, scope)
+
+@app.get("/dashboard", response_class=HTMLResponse)
+@query_budget.budget(10)
+async def dashboard(request: Request, user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, SCOPE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    data = await db.run(_dashboard_data, user.node_id)
     
-    return templates.TemplateResponse("dashboard.html", {
+    return conditional.apply(templates.TemplateResponse("dashboard.html", {
         "request": request,
         "user": user,
-        "user_node": user_node,
-        "risks_count": len(risks),
-        "incidents_count": len(incidents),
-        "actions_count": len(actions),
-        "financial_loss": financial_loss,
-        "risks": risks[:5],  # Show top 5
-        "incidents": incidents[:5]  # Show top 5
-    })
+        **data
+    }), validators)
 
 @app.get("/node-tree", response_class=HTMLResponse)
-async def node_tree(request: Request, user: models.User = Depends(require_auth), db: Session = Depends(get_db)):
-    # Get all nodes for tree visualization
-    nodes = db.query(models.Node).all()
-    
-    # Build tree structure
-    def build_tree(parent_id=None):
-        children = [n for n in nodes if n.parent_id == parent_id]
-        tree = []
-        for child in children:
-            tree.append({
-                "id": child.id,
-                "name": child.name,
-                "level": child.level,
-                "children": build_tree(child.id)
-            })
-        return tree
-    
-    tree = build_tree()
-    
-    return templates.TemplateResponse("node_tree.html", {
+@query_budget.budget(8)
+async def node_tree(request: Request, user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, TREE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    # Top levels only, cached until the hierarchy version changes; the rest loads on expand
+    tree = await db.run(org_tree.get_top_levels)
+    
+    return conditional.apply(templates.TemplateResponse("node_tree.html", {
         "request": request,
         "user": user,
         "tree": tree
-    })
+    }), validators)
+
+@app.get("/node-tree/children/{node_id}", response_class=HTMLResponse)
+@query_budget.budget(6)
+async def node_tree_children(node_id: int, request: Request, user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, TREE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    children = await db.run(org_tree.get_children, node_id)
+    
+    return conditional.apply(templates.TemplateResponse("node_children.html", {
+        "request": request,
+        "nodes": children
+    }), validators)
 
 @app.get("/insights/{node_id}")
-async def get_insights_htmx(node_id: int, request: Request, user: models.User = Depends(require_auth), db: Session = Depends(get_db)):
-    node = db.query(models.Node).filter(models.Node.id == node_id).first()
-    if not node:
+@query_budget.budget(10)
+async def get_insights_htmx(node_id: int, request: Request, user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, SCOPE_TABLES, ai.AI_PROVIDER)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    context = await db.run(_insight_context, node_id)
+    if not context:
         return HTMLResponse("<div class='error'>Node not found</div>")
     
-    # Get all descendant node IDs
-    node_ids = get_descendant_node_ids(node)
-    
-    # Aggregate data for all relevant nodes
-    risks = db.query(models.Risk).filter(models.Risk.node_id.in_(node_ids)).all()
-    incidents = db.query(models.Incident).filter(models.Incident.node_id.in_(node_ids)).all()
-    actions = db.query(models.ActionItem).join(models.Risk).filter(models.Risk.node_id.in_(node_ids)).all()
-    
     # Generate AI insight
-    prompt = f"Provide a concise AI insight for the following scope: {node.name}\n"
-    prompt += f"Risks: {len(risks)}\n"
-    prompt += f"Incidents: {len(incidents)}\n"
-    prompt += f"Actions: {len(actions)}\n"
-    if risks:
-        prompt += f"Top Risk: {risks[0].title} - {risks[0].description}\n"
-    if incidents:
-        prompt += f"Recent Incident: {incidents[0].name} - {incidents[0].description}\n"
-    if actions:
-        prompt += f"Sample Action: {actions[0].description}\n"
-    prompt += "Summarize the risk and incident landscape and suggest a next step."
-    
     try:
-        ai_insight = ai.get_insight(prompt)
+        ai_insight = await _unless_disconnected(request, ai.get_insight_async(context["prompt"]))
+        available = not ai.is_unavailable(ai_insight)
     except Exception:
         ai_insight = "AI insights temporarily unavailable."
+        available = False
+    if ai_insight is None:
+        # The HTMX client went away; nobody is waiting for this panel
+        return Response(status_code=204)
     
-    return templates.TemplateResponse("insights_partial.html", {
+    response = templates.TemplateResponse("insights_partial.html", {
         "request": request,
-        "node": node,
-        "risks_count": len(risks),
-        "incidents_count": len(incidents),
-        "actions_count": len(actions),
-        "ai_insight": ai_insight,
-        "risks": risks[:3],
-        "incidents": incidents[:3]
+        **context,
+        "ai_insight": ai_insight
     })
+    if available:
+        # Placeholder answers must not be revalidated into a 304 later
+        conditional.apply(response, validators)
+    return response
+
+@app.get("/insights/{node_id}/stream", response_class=HTMLResponse)
+@query_budget.budget(10)
+async def get_insights_stream(node_id: int, request: Request, user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, SCOPE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    # Counts and top rows render immediately; the AI text follows over SSE
+    context = await db.run(_insight_context, node_id)
+    if not context:
+        return HTMLResponse("<div class='error'>Node not found</div>")
+    
+    return conditional.apply(templates.TemplateResponse("insights_partial.html", {
+        "request": request,
+        **context,
+        "stream_url": f"/insights/{node_id}/events"
+    }), validators)
+
+@app.get("/insights/{node_id}/events")
+async def get_insights_events(node_id: int, user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    context = await db.run(_insight_context, node_id)
+    prompt = context["prompt"] if context else None
+    # The stream can run for as long as the provider does; don't hold a pooled connection for it
+    await db.release()
+    
+    async def events():
+        # Keep the browser from reconnecting before the panel closes the source
+        yield "retry: 600000\n\n"
+        text = ""
+        if prompt is None:
+            text = "Node not found"
+        else:
+            try:
+                async for piece in ai.stream_insight(prompt):
+                    text += piece
+                    yield _sse_event("token", html.escape(piece))
+            except Exception:
+                text = "AI insights temporarily unavailable."
+        # Replace the streaming element with the final text, which also closes the source
+        yield _sse_event("done", f'<p class="text-blue-100 italic">{html.escape(text)}</p>')
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/risks", response_class=HTMLResponse)
-async def risks_page(request: Request, user: models.User = Depends(require_auth), db: Session = Depends(get_db)):
-    # Get user's accessible risks
-    user_node = db.query(models.Node).filter(models.Node.id == user.node_id).first()
-    if user_node:
-        node_ids = get_descendant_node_ids(user_node)
-        risks = db.query(models.Risk).filter(models.Risk.node_id.in_(node_ids)).all()
-    else:
-        risks = []
+@query_budget.budget(10)
+async def risks_page(request: Request, risk_status: Optional[str] = Query(None, alias="status"), risk_type: Optional[str] = None,
+                     date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, SCOPE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    # First page of the user's risks; later pages load from /risks/rows on scroll
+    filters = {"status": risk_status, "risk_type": risk_type, "date_from": date_from, "date_to": date_to}
+    data = await db.run(_risks_page_data, user.node_id, filters, include_header=True)
     
-    return templates.TemplateResponse("risks.html", {
+    return conditional.apply(templates.TemplateResponse("risks.html", {
         "request": request,
         "user": user,
-        "risks": risks
-    })
+        "filters": filters,
+        "first_page": True,
+        **data
+    }), validators)
+
+@app.get("/risks/rows", response_class=HTMLResponse)
+@query_budget.budget(6)
+async def risk_rows(request: Request, cursor: Optional[str] = None,
+                    risk_status: Optional[str] = Query(None, alias="status"),
+                    risk_type: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                    user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, SCOPE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    filters = {"status": risk_status, "risk_type": risk_type, "date_from": date_from, "date_to": date_to}
+    try:
+        data = await db.run(_risks_page_data, user.node_id, filters, cursor)
+    except ValueError:
+        return HTMLResponse("<div class='error'>Invalid page cursor</div>", status_code=400)
+    
+    return conditional.apply(templates.TemplateResponse("risk_rows.html", {"request": request, "first_page": cursor is None, **data}), validators)
 
 @app.get("/incidents", response_class=HTMLResponse)
-async def incidents_page(request: Request, user: models.User = Depends(require_auth), db: Session = Depends(get_db)):
-    # Get user's accessible incidents
-    user_node = db.query(models.Node).filter(models.Node.id == user.node_id).first()
-    if user_node:
-        node_ids = get_descendant_node_ids(user_node)
-        incidents = db.query(models.Incident).filter(models.Incident.node_id.in_(node_ids)).all()
-    else:
-        incidents = []
+@query_budget.budget(10)
+async def incidents_page(request: Request, kind: Optional[str] = None,
+                         date_from: Optional[str] = None, date_to: Optional[str] = None,
+                         user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, SCOPE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    # First page of the user's incidents; later pages load from /incidents/rows on scroll
+    filters = {"kind": kind, "date_from": date_from, "date_to": date_to}
+    data = await db.run(_incidents_page_data, user.node_id, filters, include_header=True)
     
-    return templates.TemplateResponse("incidents.html", {
+    return conditional.apply(templates.TemplateResponse("incidents.html", {
         "request": request,
         "user": user,
-        "incidents": incidents
-    })
+        "filters": filters,
+        "first_page": True,
+        **data
+    }), validators)
+
+@app.get("/incidents/rows", response_class=HTMLResponse)
+@query_budget.budget(6)
+async def incident_rows(request: Request, cursor: Optional[str] = None, kind: Optional[str] = None,
+                        date_from: Optional[str] = None, date_to: Optional[str] = None,
+                        user: auth.Principal = Depends(require_auth), db: DBRunner = Depends(get_db_runner)):
+    validators = await _validators(request, db, user, SCOPE_TABLES)
+    if conditional.is_fresh(request, validators):
+        return conditional.not_modified(validators)
+    filters = {"kind": kind, "date_from": date_from, "date_to": date_to}
+    try:
+        data = await db.run(_incidents_page_data, user.node_id, filters, cursor)
+    except ValueError:
+        return HTMLResponse("<div class='error'>Invalid page cursor</div>", status_code=400)
+    
+    return conditional.apply(templates.TemplateResponse("incident_rows.html", {"request": request, "first_page": cursor is None, **data}), validators)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        crud.ensure_node_closure(db)
+        rollups.ensure_rollups(db)
+    finally:
+        db.close()
+    if ai.AI_PRELOAD:
+        ai.warm_up()
 
 if __name__ == "__main__":
     import uvicorn
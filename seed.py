@@ -2,8 +2,12 @@
 """
 Seed script for Risk Insights HTMX application
 Run this to populate the database with sample data
+
+    python seed.py                     # small sample org, row by row
+    python seed.py --scale 100 --ai    # bulk generated dataset (see backend/app/datagen.py)
 """
 
+import argparse
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -11,6 +15,18 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from backend.app.seed_data import seed
 
 if __name__ == "__main__":
-    print("Seeding database with sample data...")
-    seed()
-    print("Database seeding completed!")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Populate the database with sample data.")
+    parser.add_argument("--scale", type=float, help="load a bulk generated dataset of this scale instead")
+    parser.add_argument("--rows-per-unit", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ai", action="store_true", help="generate text with the AI provider (bulk mode)")
+    args = parser.parse_args()
+
+    if args.scale is not None:
+        from backend.app.datagen import generate
+        print(f"Generating dataset at scale {args.scale}...")
+        print(generate(scale=args.scale, seed=args.seed, rows_per_unit=args.rows_per_unit, use_ai=args.ai))
+    else:
+        print("Seeding database with sample data...")
+        seed()
+    print("Database seeding completed!")
@@ -0,0 +1,67 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app import database, query_budget
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')"))
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(query_budget, "QUERY_BUDGET_MODE", "raise")
+
+    app = FastAPI()
+
+    @app.get("/items")
+    @query_budget.budget(2)
+    def list_items(db: Session = Depends(database.get_db)):
+        return [dict(row._mapping) for row in db.execute(text("SELECT id, name FROM items"))]
+
+    @app.get("/items/count")
+    @query_budget.budget(2)
+    def count_items(db: Session = Depends(database.get_db)):
+        for _ in range(3):
+            db.execute(text("SELECT count(*) FROM items"))
+        return {"ok": True}
+
+    @app.get("/items/names")
+    @query_budget.budget(10, max_repeats=2)
+    def item_names(db: Session = Depends(database.get_db)):
+        ids = db.execute(text("SELECT id FROM items")).scalars().all()
+        # One query per row: the N+1 shape
+        return [db.execute(text("SELECT name FROM items WHERE id = :id"), {"id": i}).scalar() for i in ids]
+
+    yield TestClient(app)
+    engine.dispose()
+
+
+def test_under_budget_passes(client):
+    response = client.get("/items")
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+
+
+def test_over_budget_raises(client):
+    with pytest.raises(query_budget.QueryBudgetExceeded) as exc:
+        client.get("/items/count")
+    assert exc.value.log.statements == 3
+    assert "GET /items/count: 3 SQL statements (budget 2)" in str(exc.value)
+
+
+def test_repeated_shape_reports_n_plus_one(client):
+    with pytest.raises(query_budget.QueryBudgetExceeded) as exc:
+        client.get("/items/names")
+    assert exc.value.log.repeated(2) == [("SELECT name FROM items WHERE id = ?", 4)]
+    assert "repeated statements (likely N+1):\n  4x SELECT name FROM items WHERE id = ?" in str(exc.value)
+
+
+def test_off_mode_records_nothing(client, monkeypatch):
+    monkeypatch.setattr(query_budget, "QUERY_BUDGET_MODE", "off")
+    assert client.get("/items/count").status_code == 200